@@ -1,16 +1,36 @@
 import os
+import asyncio
 import csv
 import io
 import json
-import requests
-from authlib.integrations.flask_client import OAuth
+import atexit
+import codecs
+import hashlib
+import queue
+import re
+import select
+import threading
+import time
+import uuid
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import httpx
 import psycopg2
-from psycopg2.extras import RealDictCursor
-from datetime import datetime
+from psycopg2.extensions import STATUS_READY
+from psycopg2.extras import RealDictCursor, execute_values
+from psycopg2.pool import ThreadedConnectionPool
+from datetime import date
 import markdown
+from jinja2 import FileSystemBytecodeCache
+from markupsafe import Markup
 from functools import wraps
+from operator import itemgetter
 import requests
+from requests.adapters import HTTPAdapter
 from urllib.parse import urlencode
+from urllib3.util.retry import Retry
 from flask import (
     Flask,
     render_template,
@@ -20,9 +40,10 @@ from flask import (
     abort,
     Response,
     flash,
+    jsonify,
     session
 )
-from groq import Groq
+from groq import AsyncGroq, DefaultAioHttpClient
 from googlesearch import search  # 구글 검색 라이브러리
 from werkzeug.security import generate_password_hash, check_password_hash
 
@@ -34,8 +55,86 @@ app = Flask(__name__)
 # 보안 키 설정 (배포 시 환경변수로 관리 권장)
 app.secret_key = os.environ.get("SECRET_KEY", "super_secret_key_backup")
 
-# Groq 클라이언트
-client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+# 운영에서는 템플릿 변경 감시를 끄고, 컴파일된 템플릿을 파일로 캐시해 재시작 후에도 재사용
+DEBUG = os.getenv("FLASK_DEBUG") == "1"
+if not DEBUG:
+    app.jinja_env.auto_reload = False
+    _jinja_cache_dir = os.getenv("JINJA_CACHE_DIR", "/tmp/jinja")
+    os.makedirs(_jinja_cache_dir, exist_ok=True)
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(_jinja_cache_dir)
+    app.config["TEMPLATES_AUTO_RELOAD"] = False
+    # 첫 요청이 템플릿 컴파일 비용을 떠안지 않도록 기동 시 전부 로드해 둔다
+    for _name in app.jinja_env.list_templates():
+        app.jinja_env.get_template(_name)
+
+# 동시에 보내는 Groq 요청 수 제한 (rate limit 보호)
+GROQ_CONCURRENCY = int(os.getenv("GROQ_CONCURRENCY", "8"))
+# 용도별 모델: 짧은 표/요약은 8b-instant, 긴 분석/작문은 70b
+SPEED_MAP = {
+    "instant": "llama-3.1-8b-instant",
+    "balanced": "llama-3.3-70b-versatile",
+}
+# 라우트별 Groq 호출 옵션
+#   tier: SPEED_MAP 키 / max_tokens: 최대 출력 토큰 (필요 이상으로 길게 생성하지 않도록)
+#   ttl: 응답 캐시 유지 시간(초). 진단은 짧게, 전공-기업 직무 추천처럼 잘 안 바뀌는 건 길게
+#   temperature: 작문(이력서/자소서)은 다시 요청하면 다른 초안이 나와야 하므로 0.5 (응답 캐시 안 씀)
+GROQ_OPTIONS = {
+    "analyze": {"max_tokens": 1200, "ttl": 600},
+    "career": {"tier": "instant", "max_tokens": 600, "ttl": 86400},
+    "company_analyze": {"tier": "instant", "max_tokens": 1000, "ttl": 3600},
+    "resume": {"max_tokens": 800, "temperature": 0.5},
+    "cover_letter": {"max_tokens": 1200, "temperature": 0.5},
+}
+# 분석/추천 기본값: 같은 프롬프트엔 같은 답이 나오도록 0 (응답 캐시가 의미를 가짐)
+GROQ_TEMPERATURE = float(os.getenv("GROQ_TEMPERATURE", "0"))
+# aiohttp 커넥터가 여는 소켓 수 상한 (keep-alive 로 재사용할 연결은 동시 요청 수만큼)
+GROQ_MAX_CONNECTIONS = int(os.getenv("GROQ_MAX_CONNECTIONS", "32"))
+# 응답 전체 대기 상한(초). 연결 수립은 짧게 끊어 죽은 연결에 오래 매달리지 않는다
+GROQ_TIMEOUT = float(os.getenv("GROQ_TIMEOUT", "30"))
+
+# 키가 없으면 클라이언트를 만들지 않고, AI 호출은 프롬프트를 만들기 전에 "API Key Error" 로 끝낸다
+_HAS_GROQ = bool(os.getenv("GROQ_API_KEY"))
+
+# Groq 비동기 클라이언트 (aiohttp 백엔드, 아래 전용 이벤트 루프에서만 사용)
+client = AsyncGroq(
+    api_key=os.getenv("GROQ_API_KEY"),
+    http_client=DefaultAioHttpClient(
+        limits=httpx.Limits(
+            max_connections=GROQ_MAX_CONNECTIONS,
+            max_keepalive_connections=GROQ_CONCURRENCY,
+        ),
+        timeout=httpx.Timeout(GROQ_TIMEOUT, connect=5.0),
+    ),
+) if _HAS_GROQ else None
+_groq_semaphore = asyncio.Semaphore(GROQ_CONCURRENCY)
+
+# Flask 워커 스레드들이 함께 쓰는 asyncio 이벤트 루프
+_loop = asyncio.new_event_loop()
+threading.Thread(target=_loop.run_forever, name="asyncio-loop", daemon=True).start()
+
+
+def run_async(coro):
+    """
+    동기 라우트에서 코루틴을 공유 이벤트 루프에 넘기고 결과를 기다린다.
+    """
+    return asyncio.run_coroutine_threadsafe(coro, _loop).result()
+
+
+# run_parallel 전용 스레드 풀. 이벤트 루프 기본 executor(to_thread)와 나눠 두어야
+# to_thread 안에서 run_parallel 을 부를 때(agenerate → 프롬프트 빌더) 같은 풀을 서로 기다리며 멈추지 않는다
+_parallel_pool = ThreadPoolExecutor(
+    max_workers=int(os.getenv("PARALLEL_WORKERS", "16")), thread_name_prefix="parallel"
+)
+
+
+def run_parallel(*calls):
+    """
+    (함수, 인자...) 튜플로 받은 블로킹 호출들을 스레드에서 동시에 돌리고 결과를 순서대로 돌려준다.
+    예: 구글 검색(외부 API)과 DB 조회를 겹쳐서 기다린다.
+    calls 안의 함수가 다시 run_parallel 을 부르면 안 된다 (같은 풀을 기다리게 됨).
+    """
+    futures = [_parallel_pool.submit(func, *args) for func, *args in calls]
+    return [future.result() for future in futures]
 
 # 자동완성용 기업 목록
 COMPANY_OPTIONS = [
@@ -46,6 +145,10 @@ COMPANY_OPTIONS = [
     "충청남도청", "대전광역시청", "지역 소방서", "지역 경찰서",
     "구글코리아", "넷플릭스서비시스코리아", "한국철도공사(코레일)", "CJ ENM"
 ]
+# 기업 자동완성 <datalist> 옵션: 고정 목록이라 부분 템플릿을 기동 시 한 번만 렌더링해 둔다
+COMPANY_OPTIONS_HTML = Markup(
+    app.jinja_env.get_template("_company_options.html").render(company_options=COMPANY_OPTIONS)
+)
 
 # 학과 목록
 MAJORS = {
@@ -64,145 +167,668 @@ MAJORS = {
 # =========================
 # 2. DB 유틸리티 (PostgreSQL)
 # =========================
-db_initialized = False
+# 프로세스 전역 커넥션 풀 (요청마다 TCP/TLS/인증 핸드셰이크를 반복하지 않도록)
+# 최소 개수만큼은 미리 열어 두어 첫 요청들도 핸드셰이크 없이 처리
+PG_POOL_MIN = int(os.getenv("PG_POOL_MIN", "2"))
+PG_POOL_MAX = int(os.getenv("PG_POOL_MAX", "10"))
+# 풀이 다 차면 getconn 은 기다리지 않고 바로 PoolError 를 내므로, 빈 자리가 날 때까지 여기서 기다린다
+PG_POOL_TIMEOUT = float(os.getenv("PG_POOL_TIMEOUT", "10"))
+_pool = None
+_pool_lock = threading.Lock()
+_pool_slots = threading.BoundedSemaphore(PG_POOL_MAX)
+
+
+def get_pool():
+    """
+    커넥션 풀을 처음 사용할 때 한 번만 만든다.
+    DATABASE_URL이 없거나 연결에 실패하면 None.
+    """
+    global _pool
+    if _pool is None:
+        db_url = os.getenv("DATABASE_URL")
+        if not db_url:
+            return None
+        with _pool_lock:
+            if _pool is None:
+                try:
+                    _pool = ThreadedConnectionPool(
+                        minconn=PG_POOL_MIN,
+                        maxconn=PG_POOL_MAX,
+                        dsn=db_url,
+                        cursor_factory=RealDictCursor,
+                    )
+                except Exception as e:
+                    print(f"DB Error: {e}")
+                    return None
+                # pgbouncer 트랜잭션 모드(Neon -pooler)로는 LISTEN 알림이 오지 않으므로
+                # 직접 연결 URL 이 따로 있으면 LISTEN 은 그쪽으로 한다
+                threading.Thread(
+                    target=listen_for_changes,
+                    args=(os.getenv("DATABASE_URL_DIRECT") or db_url,),
+                    name="pg-listen",
+                    daemon=True,
+                ).start()
+    return _pool
+
+
+# 이 시간(초)보다 오래 쉰 커넥션은 빌려주기 전에 SELECT 1 로 살아 있는지 확인한다.
+# (Neon 은 유휴 시 컴퓨트를 내려서 풀 안의 연결이 조용히 끊겨 있을 수 있다)
+PG_PING_IDLE = float(os.getenv("PG_PING_IDLE", "60"))
+# 커넥션 -> 마지막 반납 시각. 기록이 없는 커넥션(기동 때 미리 연 PG_POOL_MIN 개 등)은
+# 언제 열렸는지 모르므로 처음 빌려줄 때 한 번 확인한다
+_conn_last_used = weakref.WeakKeyDictionary()
+
+
+def checkout(pool):
+    """
+    풀에서 살아 있는 커넥션을 꺼낸다. 끊긴 커넥션은 닫아서 풀에서 버리고 다시 꺼낸다.
+    """
+    for _ in range(PG_POOL_MAX + 1):
+        conn = pool.getconn()
+        if not conn.closed:
+            last_used = _conn_last_used.get(conn)
+            if last_used is not None and time.monotonic() - last_used < PG_PING_IDLE:
+                return conn
+            try:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT 1")
+                conn.rollback()
+                return conn
+            except psycopg2.Error:
+                pass
+        pool.putconn(conn, close=True)
+    raise psycopg2.OperationalError("살아 있는 DB 커넥션을 얻지 못했습니다")
+
+
+@contextmanager
+def db_conn():
+    """
+    풀에서 커넥션을 빌려주고, 블록이 끝나면 닫지 않고 풀에 반납한다.
+    연결할 수 없으면 None을 넘겨준다.
+    예외 등으로 트랜잭션이 열린 채 끝났으면 롤백해서 다음 요청이 깨끗한 커넥션을 받게 한다.
+    연결이 끊긴 커넥션(conn.closed)은 풀에 돌려놓지 않고 닫는다.
+    (statement timeout 같은 예외는 커넥션이 멀쩡하므로 롤백만 하고 돌려놓는다)
+    풀이 모두 사용 중이면 PG_POOL_TIMEOUT 초까지 반납을 기다린다.
+    """
+    pool = get_pool()
+    conn = None
+    slot = False
+    if pool is not None:
+        slot = _pool_slots.acquire(timeout=PG_POOL_TIMEOUT)
+        if not slot:
+            print("DB Error: 커넥션 풀 대기 시간 초과")
+        else:
+            try:
+                conn = checkout(pool)
+            except Exception as e:
+                print(f"DB Error: {e}")
+    try:
+        yield conn
+    finally:
+        if conn is not None:
+            broken = bool(conn.closed)
+            if not broken and conn.status != STATUS_READY:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    broken = True
+            if not broken:
+                _conn_last_used[conn] = time.monotonic()
+            pool.putconn(conn, close=broken)
+        if slot:
+            _pool_slots.release()
+
+
+# 자주 도는 단건 조회는 PREPARE/EXECUTE 로 커넥션당 한 번만 파싱/플랜한다.
+# PREPARE 는 DB 세션에 묶이므로 pgbouncer(Neon -pooler) 트랜잭션 모드에선 쓰면 안 된다 → 직접 연결일 때만 PG_PREPARE=1
+PG_PREPARE = os.getenv("PG_PREPARE") == "1"
+# experience 를 행 단위로 돌려줄 때 쓰는 컬럼. SELECT * 는 search_tsv(tsvector)까지 실어 보내고,
+# 컬럼이 추가되면 준비된 플랜이 "cached plan must not change result type" 으로 깨진다.
+EXPERIENCE_COLUMNS = (
+    "id, user_id, category, title, description, start_date, end_date, skills, hours, link, created_at"
+)
+PREPARED_SQL = {
+    "user_by_id": "SELECT id, email, created_at FROM users WHERE id = $1",
+    "profile_by_user": "SELECT * FROM profile WHERE user_id = $1",
+    "exp_by_id": f"SELECT {EXPERIENCE_COLUMNS} FROM experience WHERE id = $1",
+    "exp_by_id_user": f"SELECT {EXPERIENCE_COLUMNS} FROM experience WHERE id = $1 AND user_id = $2",
+    "exp_by_user": (
+        f"SELECT {EXPERIENCE_COLUMNS} FROM experience WHERE user_id = $1 "
+        "ORDER BY start_date DESC NULLS LAST, id DESC"
+    ),
+}
+# PG_PREPARE 가 꺼져 있을 때 쓰는 같은 쿼리의 %s 버전
+_PLAIN_SQL = {name: re.sub(r"\$\d+", "%s", sql) for name, sql in PREPARED_SQL.items()}
+# 커넥션별로 이미 PREPARE 한 이름 (커넥션이 닫혀 사라지면 같이 사라진다)
+_prepared = weakref.WeakKeyDictionary()
 
-@app.before_request
-def initialize_db_once():
-    global db_initialized
-    if not db_initialized:
-        try:
-            init_db()
-            db_initialized = True
-            print("DB initialized once")
-        except Exception as e:
-            print("DB init error:", e)
 
-def get_db_connection():
-    db_url = os.getenv("DATABASE_URL")
-    if not db_url:
-        return None
-    try:
-        return psycopg2.connect(db_url, cursor_factory=RealDictCursor)
-    except Exception as e:
-        print(f"DB Error: {e}")
-        return None
+def execute_prepared(cur, name, params):
+    """
+    PREPARED_SQL[name] 을 실행한다. 이 커넥션에서 처음이면 PREPARE 부터 한다.
+    """
+    if not PG_PREPARE:
+        cur.execute(_PLAIN_SQL[name], params)
+        return
+    names = _prepared.setdefault(cur.connection, set())
+    if name not in names:
+        cur.execute(f"PREPARE {name} AS {PREPARED_SQL[name]}")
+        names.add(name)
+    cur.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", params)
+
+
+@atexit.register
+def close_pool():
+    if _pool is not None:
+        _pool.closeall()
 
 
 def init_db():
     """
-    Neon(PostgreSQL)에 users / profile / experience 테이블 생성.
-    before_first_request에서 한 번만 호출된다.
+    Neon(PostgreSQL)에 users / profile / experience / ai_job 테이블 생성.
+    모듈 import 시(워커 기동 시) 한 번만 호출된다.
     """
-    conn = get_db_connection()
-    if not conn:
-        print("❌ DB 연결 실패")
-        return
-    cur = conn.cursor()
+    with db_conn() as conn:
+        if not conn:
+            print("❌ DB 연결 실패")
+            return
+        cur = conn.cursor()
 
-    # users 테이블
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            id SERIAL PRIMARY KEY,
-            email VARCHAR(120) UNIQUE NOT NULL,
-            password_hash VARCHAR(255) NOT NULL,
-            created_at VARCHAR(50)
-        );
-    """)
-
-    # profile 테이블 (users와 1:1 매칭)
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS profile (
-            user_id INTEGER PRIMARY KEY,
-            name VARCHAR(100),
-            major VARCHAR(100),
-            career_goal TEXT,
-            strengths TEXT,
-            ai_instructions TEXT,
-            CONSTRAINT fk_profile_user
-              FOREIGN KEY (user_id)
-              REFERENCES users(id)
-              ON DELETE CASCADE
-        );
-    """)
-
-    # experience 테이블 (user_id FK)
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS experience (
-            id SERIAL PRIMARY KEY,
-            user_id INTEGER NOT NULL,
-            category VARCHAR(100),
-            title VARCHAR(255),
-            description TEXT,
-            start_date VARCHAR(20),
-            end_date VARCHAR(20),
-            skills TEXT,
-            hours INTEGER,
-            link TEXT,
-            created_at VARCHAR(50),
-            CONSTRAINT fk_experience_user
-              FOREIGN KEY (user_id)
-              REFERENCES users(id)
-              ON DELETE CASCADE
-        );
-    """)
+        # users 테이블
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS users (
+                id SERIAL PRIMARY KEY,
+                email VARCHAR(120) UNIQUE NOT NULL,
+                password_hash VARCHAR(255) NOT NULL,
+                created_at TIMESTAMP(0) DEFAULT NOW(),
+                provider VARCHAR(20),
+                provider_id VARCHAR(100)
+            );
+        """)
+        # 소셜 로그인 컬럼이 없던 예전 users 테이블에도 추가
+        cur.execute("""
+            ALTER TABLE users
+                ADD COLUMN IF NOT EXISTS provider VARCHAR(20),
+                ADD COLUMN IF NOT EXISTS provider_id VARCHAR(100);
+        """)
+
+        # profile 테이블 (users와 1:1 매칭)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS profile (
+                user_id INTEGER PRIMARY KEY,
+                name VARCHAR(100),
+                major VARCHAR(100),
+                career_goal TEXT,
+                strengths TEXT,
+                ai_instructions TEXT,
+                CONSTRAINT fk_profile_user
+                  FOREIGN KEY (user_id)
+                  REFERENCES users(id)
+                  ON DELETE CASCADE
+            );
+        """)
+
+        # experience 테이블 (user_id FK)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS experience (
+                id SERIAL PRIMARY KEY,
+                user_id INTEGER NOT NULL,
+                category VARCHAR(100),
+                title VARCHAR(255),
+                description TEXT,
+                start_date DATE,
+                end_date DATE,
+                skills TEXT,
+                hours INTEGER,
+                link TEXT,
+                created_at TIMESTAMP(0) DEFAULT NOW(),
+                CONSTRAINT fk_experience_user
+                  FOREIGN KEY (user_id)
+                  REFERENCES users(id)
+                  ON DELETE CASCADE
+            );
+        """)
+
+        # 목록 정렬(ORDER BY start_date DESC NULLS LAST)과 카테고리 집계용 인덱스
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS idx_experience_start_date
+            ON experience (start_date DESC NULLS LAST);
+        """)
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS idx_experience_category
+            ON experience (category);
+        """)
+        # 유저별 목록/페이지(WHERE user_id = ? ORDER BY start_date DESC NULLS LAST, id DESC)를
+        # 정렬 없이 인덱스 순서대로 읽도록
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS idx_experience_user_start
+            ON experience (user_id, start_date DESC NULLS LAST, id DESC);
+        """)
+        # 소셜 로그인 콜백마다 도는 WHERE provider = ? AND provider_id = ? 조회용
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS idx_users_provider
+            ON users (provider, provider_id);
+        """)
+        # 백그라운드 AI 작업 (job_id 하나에 작업 이름별로 한 행, result 가 NULL 이면 진행 중)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS ai_job (
+                job_id VARCHAR(32) NOT NULL,
+                name VARCHAR(30) NOT NULL,
+                user_id INTEGER,
+                result TEXT,
+                created_at TIMESTAMP(0) DEFAULT NOW(),
+                PRIMARY KEY (job_id, name)
+            );
+        """)
 
-    conn.commit()
-    cur.close()
-    conn.close()
+        conn.commit()
+
+        # 예전 VARCHAR(20) 날짜 컬럼을 DATE로 변환 (이미 DATE면 건너뜀)
+        # CSV 로 들어온 자유 텍스트도 있으므로 2024-03-01 / 2024.3.1 / 2024/03 꼴만 날짜로 바꾸고
+        # 나머지는 NULL 로 둔다. 모든 쿼리가 DATE 비교(end_date < CURRENT_DATE)를 하므로
+        # 그래도 변환에 실패하면 VARCHAR 로 둔 채 뜨지 않고 기동을 멈춘다.
+        cur.execute("""
+            SELECT column_name FROM information_schema.columns
+            WHERE table_name = 'experience'
+              AND column_name IN ('start_date', 'end_date')
+              AND data_type <> 'date'
+        """)
+        for row in cur.fetchall():
+            col = row["column_name"]
+            value = f"regexp_replace(btrim({col}), '[./]', '-', 'g')"
+            as_date = f"""CASE
+                WHEN {value} ~ '^\\d{{4}}-\\d{{1,2}}-\\d{{1,2}}$' THEN {value}::date
+                WHEN {value} ~ '^\\d{{4}}-\\d{{1,2}}$' THEN ({value} || '-01')::date
+            END"""
+            try:
+                cur.execute(
+                    f"SELECT COUNT(*) AS cnt FROM experience WHERE btrim({col}) <> '' AND ({as_date}) IS NULL"
+                )
+                dropped = cur.fetchone()["cnt"]
+                cur.execute(f"ALTER TABLE experience ALTER COLUMN {col} TYPE DATE USING {as_date}")
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                raise RuntimeError(f"experience.{col} 를 DATE 로 바꾸지 못했습니다: {e}") from e
+            if dropped:
+                print(f"⚠️ experience.{col}: 날짜로 읽을 수 없는 값 {dropped}개를 비웠습니다")
+
+        # 예전 VARCHAR(50) created_at 도 TIMESTAMP 로 (가입일 정렬/비교를 문자열이 아닌 시각으로)
+        try:
+            cur.execute("""
+                SELECT table_name FROM information_schema.columns
+                WHERE table_name IN ('users', 'experience')
+                  AND column_name = 'created_at'
+                  AND data_type NOT LIKE 'timestamp%'
+            """)
+            for row in cur.fetchall():
+                table = row["table_name"]
+                cur.execute(
+                    f"ALTER TABLE {table} ALTER COLUMN created_at TYPE TIMESTAMP(0)"
+                    " USING NULLIF(created_at, '')::timestamp"
+                )
+            # 기존 테이블에도 기본값을 걸어 INSERT 에서 created_at 을 빼도 채워지게
+            for table in ("users", "experience"):
+                cur.execute(f"ALTER TABLE {table} ALTER COLUMN created_at SET DEFAULT NOW()")
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            print("❌ created_at 컬럼 변환 실패:", e)
+
+        # 검색용: 제목 부분일치(ILIKE)는 trigram, 본문 전체검색은 생성 tsvector 컬럼 + GIN.
+        # 생성 컬럼이라 기존 INSERT/UPDATE 는 그대로 둔다.
+        # 대시보드 검색(?q=)이 search_tsv 를 쓰므로 확장 설치와 따로 처리한다.
+        try:
+            cur.execute("""
+                ALTER TABLE experience ADD COLUMN IF NOT EXISTS search_tsv tsvector
+                GENERATED ALWAYS AS (
+                    to_tsvector('simple',
+                        coalesce(title, '') || ' ' ||
+                        coalesce(description, '') || ' ' ||
+                        coalesce(skills, ''))
+                ) STORED;
+            """)
+            cur.execute("""
+                CREATE INDEX IF NOT EXISTS idx_exp_tsv
+                ON experience USING GIN (search_tsv);
+            """)
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            print("❌ 검색 컬럼 생성 실패:", e)
+        # 확장 설치 권한이 없는 DB도 있으니 실패해도 나머지 초기화는 진행한다 (ILIKE 는 인덱스 없이도 동작)
+        try:
+            cur.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm;")
+            cur.execute("""
+                CREATE INDEX IF NOT EXISTS idx_exp_title_trgm
+                ON experience USING GIN (title gin_trgm_ops);
+            """)
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            print("❌ 검색 인덱스 생성 실패:", e)
+
+        cur.close()
     print("✅ DB 초기화 완료 (테이블 생성됨)")
 
 
 def fetch_all_experiences(order_by_recent=True, user_id=None):
     """
     user_id가 있으면 해당 유저 것만, 없으면 전체(관리자용).
+    status(completed/ongoing)는 DB에서 날짜 비교로 계산한다.
+    DB 연결이 없으면 None (활동 0개인 [] 와 구분해서 캐시하지 않게).
     """
-    conn = get_db_connection()
-    if not conn:
-        return []
-    cur = conn.cursor()
-    sql = "SELECT * FROM experience"
-    params = []
-    if user_id is not None:
-        sql += " WHERE user_id = %s"
-        params.append(user_id)
-    if order_by_recent:
-        sql += " ORDER BY start_date DESC NULLS LAST"
-    cur.execute(sql, tuple(params))
-    rows = cur.fetchall()
-    cur.close()
-    conn.close()
+    with db_conn() as conn:
+        if not conn:
+            return None
+        cur = conn.cursor()
+        sql = (
+            "SELECT id, category, title, description, start_date, end_date, skills, hours, link,"
+            " CASE WHEN end_date < CURRENT_DATE THEN 'completed' ELSE 'ongoing' END AS status"
+            " FROM experience"
+        )
+        params = []
+        if user_id is not None:
+            sql += " WHERE user_id = %s"
+            params.append(user_id)
+        if order_by_recent:
+            sql += " ORDER BY start_date DESC NULLS LAST"
+        cur.execute(sql, tuple(params))
+        rows = cur.fetchall()
+        cur.close()
     return rows
 
 
+INDEX_PAGE_SIZE = 20
+# OFFSET 이 터무니없이 커지지 않도록 (?page= 는 사용자 입력)
+INDEX_MAX_PAGE = 1000
+
+
+def fetch_index_summary(user_id=None, page=1, q=""):
+    """
+    대시보드(index)용 경험 목록(page 번째 INDEX_PAGE_SIZE 개) + 전체 건수/총점 + 카테고리 통계를
+    한 번의 쿼리로 가져온다.
+    q 가 있으면 목록과 match_count 만 검색 결과로 좁힌다 (통계는 전체 기준).
+    status 도 SQL에서 계산한다(색상은 템플릿에서 매핑). DB 연결이 없으면 None.
+    """
+    with db_conn() as conn:
+        if not conn:
+            return None
+        cur = conn.cursor()
+        params = {
+            "user_id": user_id,
+            "q": q,
+            # ILIKE 와일드카드로 해석되지 않도록 이스케이프
+            "like": "%" + q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%",
+            "limit": INDEX_PAGE_SIZE,
+            "offset": (page - 1) * INDEX_PAGE_SIZE,
+        }
+        where = " WHERE user_id = %(user_id)s" if user_id is not None else ""
+        # 단어 검색(제목/설명/기술)은 search_tsv GIN 인덱스, 제목 부분일치는 trigram 인덱스로 찾는다
+        match = (
+            " WHERE id IN (SELECT id FROM experience"
+            " WHERE search_tsv @@ plainto_tsquery('simple', %(q)s) OR title ILIKE %(like)s)"
+        ) if q else ""
+        cur.execute(
+            f"""
+            WITH e AS (
+                SELECT id, category, title, start_date, end_date, skills, hours,
+                    -- 목록 카드는 한 줄로 잘라 보여주므로 설명 전체를 보낼 필요가 없다
+                    LEFT(description, 200) AS description,
+                    CASE WHEN end_date < CURRENT_DATE THEN 'completed' ELSE 'ongoing' END AS status
+                FROM experience{where}
+            ),
+            m AS (SELECT * FROM e{match})
+            SELECT
+                COALESCE((
+                    SELECT json_agg(p ORDER BY start_date DESC NULLS LAST, id DESC) FROM (
+                        SELECT * FROM m ORDER BY start_date DESC NULLS LAST, id DESC
+                        LIMIT %(limit)s OFFSET %(offset)s
+                    ) p
+                ), '[]') AS rows,
+                (SELECT COUNT(*) FROM m) AS match_count,
+                (SELECT COUNT(*) FROM e) AS total_count,
+                (SELECT COALESCE(SUM(hours), 0) FROM e) AS total_hours,
+                COALESCE((
+                    SELECT json_agg(c) FROM (
+                        SELECT category, COUNT(*) AS cnt FROM e GROUP BY category ORDER BY cnt DESC
+                    ) c
+                ), '[]') AS categories
+            """,
+            params,
+        )
+        summary = cur.fetchone()
+        cur.close()
+    return summary
+
+
 def get_profile(user_id):
     """
     유저별 프로필 1개.
     """
     if not user_id:
         return {}
-    conn = get_db_connection()
-    if not conn:
-        return {}
-    cur = conn.cursor()
-    cur.execute("SELECT * FROM profile WHERE user_id = %s", (user_id,))
-    row = cur.fetchone()
-    cur.close()
-    conn.close()
-    return dict(row) if row else {}
+    profile = lru_get(_profile_cache, user_id)
+    if profile is not None:
+        return profile
+    with db_conn() as conn:
+        if not conn:
+            return {}
+        cur = conn.cursor()
+        execute_prepared(cur, "profile_by_user", (user_id,))
+        row = cur.fetchone()
+        cur.close()
+    # 프로필 행이 없는 유저도 캐시해서 AI 요청마다 빈 조회를 반복하지 않는다
+    # (settings 저장 / profile_changed 알림 때 지워짐)
+    profile = row or {}
+    lru_put(_profile_cache, user_id, profile, maxsize=USER_CACHE_SIZE, ttl=LOCAL_CACHE_TTL)
+    return profile
+
+
+EMPTY_PORTFOLIO_TEXT = "활동 없음"
+
+
+PORTFOLIO_LINE = "- [{}] {} ({}) | 기술: {} | 중요도: {} | 내용: {}"
+STATUS_LABELS = {"completed": "완료", "ongoing": "진행 중"}
+# 행마다 dict 조회를 반복하지 않도록 필요한 컬럼을 한 번에 꺼낸다
+_portfolio_fields = itemgetter("status", "title", "category", "skills", "hours", "description")
 
 
 def build_portfolio_text(exps):
-    lines = []
-    today = datetime.now().strftime("%Y-%m-%d")
-    for e in exps:
-        status = "완료" if (e['end_date'] and e['end_date'] < today) else "진행 중"
-        rating = f"{e['hours']}점" if e['hours'] else "미설정"
-        line = (
-            f"- [{status}] {e['title']} ({e['category']}) | 기술: {e['skills']} "
-            f"| 중요도: {rating} | 내용: {e['description']}"
-        )
-        lines.append(line)
-    return "\n".join(lines) if lines else "활동 없음"
+    fmt = PORTFOLIO_LINE.format
+    lines = [
+        fmt(STATUS_LABELS[status], title, category, skills, f"{hours}점" if hours else "미설정", description)
+        for status, title, category, skills, hours, description in map(_portfolio_fields, exps)
+    ]
+    return "\n".join(lines) if lines else EMPTY_PORTFOLIO_TEXT
+
+
+# =========================
+# 2-1. 캐시 (포트폴리오 텍스트 / AI 응답)
+# =========================
+# experience 테이블이 바뀔 때마다 올리는 데이터 버전
+_data_version = 0
+_cache_lock = threading.Lock()
+# 아래 DB 캐시들은 LISTEN/NOTIFY 나 이 프로세스의 쓰기로 무효화되지만, 알림이 안 오는 배포이거나
+# 알림을 놓쳐도 다른 워커가 이 시간(초)보다 오래 예전 데이터를 보여주지 않도록 만료도 건다
+LOCAL_CACHE_TTL = int(os.getenv("LOCAL_CACHE_TTL", "300"))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "1024"))
+# user_id -> (데이터 버전, 포트폴리오 텍스트) (LRU + TTL)
+_portfolio_cache = OrderedDict()
+# (user_id, page) -> ((데이터 버전, 날짜), 대시보드 요약) (LRU + TTL)
+INDEX_CACHE_SIZE = int(os.getenv("INDEX_CACHE_SIZE", "512"))
+_index_cache = OrderedDict()
+# blake2b(model + system_msg + prompt) -> AI 응답 원문 (LRU + TTL)
+GROQ_CACHE_SIZE = int(os.getenv("GROQ_CACHE_SIZE", "256"))
+GROQ_CACHE_TTL = int(os.getenv("GROQ_CACHE_TTL", "1800"))
+_groq_cache = OrderedDict()
+# blake2b-128(AI 응답 원문) -> 마크다운 변환 HTML (LRU)
+_markdown_cache = OrderedDict()
+# user_id -> profile 행 (LRU + TTL)
+_profile_cache = OrderedDict()
+# (검색어, 결과 수) -> 구글 검색 요약 텍스트 (LRU + TTL)
+SEARCH_CACHE_TTL = int(os.getenv("SEARCH_CACHE_TTL", "21600"))
+_search_cache = OrderedDict()
+
+
+def bump_data_version():
+    global _data_version
+    with _cache_lock:
+        _data_version += 1
+
+
+def notify_change(cur, channel, payload=""):
+    """
+    같은 트랜잭션 안에서 NOTIFY 를 보낸다 (커밋될 때 다른 워커에 전달됨).
+    """
+    cur.execute("SELECT pg_notify(%s, %s)", (channel, payload))
+
+
+def listen_for_changes(db_url):
+    """
+    워커(프로세스)마다 하나씩 도는 LISTEN 스레드.
+    다른 워커에서 데이터가 바뀌면 이 프로세스의 캐시를 비운다.
+    """
+    while True:
+        try:
+            conn = psycopg2.connect(db_url)
+            conn.autocommit = True
+            cur = conn.cursor()
+            cur.execute("LISTEN profile_changed; LISTEN experience_changed;")
+            while True:
+                if select.select([conn], [], [], 60) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    notify = conn.notifies.pop(0)
+                    if notify.channel == "profile_changed":
+                        with _cache_lock:
+                            _profile_cache.pop(int(notify.payload), None)
+                    else:
+                        bump_data_version()
+        except Exception as e:
+            print(f"LISTEN Error: {e}")
+            # 연결이 끊긴 동안 놓친 알림이 있을 수 있으니 전부 무효화
+            with _cache_lock:
+                _profile_cache.clear()
+            bump_data_version()
+            time.sleep(5)
+
+
+def get_portfolio_text(user_id):
+    """
+    build_portfolio_text 결과를 유저별로 캐시한다.
+    데이터 버전이 바뀌었을 때만 DB를 다시 읽는다.
+    """
+    version = _data_version
+    cached = lru_get(_portfolio_cache, user_id)
+    if cached and cached[0] == version:
+        return cached[1]
+    exps = fetch_all_experiences(user_id=user_id)
+    if exps is None:
+        # 연결 실패를 "활동 없음"으로 캐시하면 DB가 돌아와도 다음 쓰기 전까지 빈 포트폴리오가 남는다
+        return EMPTY_PORTFOLIO_TEXT
+    text = build_portfolio_text(exps)
+    lru_put(_portfolio_cache, user_id, (version, text), maxsize=USER_CACHE_SIZE, ttl=LOCAL_CACHE_TTL)
+    return text
+
+
+# 모든 라우트가 같은 system 메시지를 써야 [system + 프로필/활동] 구간이 요청마다 같아져
+# Groq prefix 캐시가 라우트를 가리지 않고 재사용된다. 라우트별 역할은 user 메시지 끝의 역할= 로 준다.
+SYSTEM_MSG = "한국 대학생 취업 준비를 돕는 AI. 한국어 마크다운으로 답한다."
+
+
+def build_prompt_prefix(user_id):
+    """
+    모든 AI 프롬프트 앞에 똑같이 붙는 사용자 정보 한 줄 + [활동 목록] 블록.
+    입력 토큰을 줄이려고 라벨은 key=value; 형태로 짧게 쓴다.
+    가장 긴 부분을 항상 같은 내용/순서로 맨 앞에 두어야 Groq 쪽 prefix 캐시가 재사용된다.
+    라우트별로 달라지는 검색 결과나 지시문은 이 뒤에 붙인다.
+    """
+    profile = get_profile(user_id)
+    return (
+        f"이름={profile.get('name') or ''};전공={profile.get('major') or ''};"
+        f"목표={profile.get('career_goal') or ''};강점={profile.get('strengths') or ''}\n"
+        f"[활동 목록]\n{get_portfolio_text(user_id)}\n"
+    )
+
+
+EMPTY_INDEX_SUMMARY = {"rows": [], "match_count": 0, "total_count": 0, "total_hours": 0, "categories": []}
+
+
+def get_index_summary(user_id, page=1, q=""):
+    """
+    fetch_index_summary 결과를 유저별로 캐시한다.
+    status(완료/진행 중)가 오늘 날짜 기준이라 날짜가 바뀌어도 다시 읽는다.
+    검색(q) 결과는 조합이 너무 많아 캐시하지 않는다.
+    """
+    if q:
+        return fetch_index_summary(user_id, page, q) or EMPTY_INDEX_SUMMARY
+    key = (_data_version, date.today())
+    cached = lru_get(_index_cache, (user_id, page))
+    if cached and cached[0] == key:
+        return cached[1]
+    summary = fetch_index_summary(user_id, page)
+    if summary is None:
+        # 연결 실패 결과는 캐시하지 않는다
+        return EMPTY_INDEX_SUMMARY
+    # 범위를 벗어난 빈 페이지는 캐시하지 않는다 (index 가 마지막 페이지로 다시 읽음)
+    if page == 1 or summary["rows"]:
+        lru_put(_index_cache, (user_id, page), (key, summary), maxsize=INDEX_CACHE_SIZE, ttl=LOCAL_CACHE_TTL)
+    return summary
+
+
+def groq_cache_key(prompt, system_msg, model=""):
+    return hashlib.blake2b((model + system_msg + prompt).encode()).hexdigest()
+
+
+def lru_get(cache, key):
+    with _cache_lock:
+        entry = cache.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and time.monotonic() >= expires_at:
+            del cache[key]
+            return None
+        cache.move_to_end(key)
+        return value
+
+
+def lru_put(cache, key, value, maxsize=GROQ_CACHE_SIZE, ttl=None):
+    """
+    ttl(초)을 주면 그 시간이 지난 뒤 lru_get 에서 만료 처리한다.
+    """
+    expires_at = time.monotonic() + ttl if ttl else None
+    with _cache_lock:
+        cache[key] = (value, expires_at)
+        cache.move_to_end(key)
+        while len(cache) > maxsize:
+            cache.popitem(last=False)
+
+
+# 확장(extra/tables) 로딩 비용을 매번 치르지 않도록 Markdown 인스턴스를 재사용.
+# 인스턴스는 스레드 안전하지 않으므로 락으로 줄 세우지 않고 스레드마다 하나씩 둔다.
+_md_local = threading.local()
+
+
+def get_markdown():
+    md = getattr(_md_local, "md", None)
+    if md is None:
+        md = _md_local.md = markdown.Markdown(extensions=['extra', 'nl2br', 'tables'])
+    return md
+
+
+def render_markdown(raw_text):
+    """
+    AI 응답(마크다운)을 HTML로 변환. 같은 응답은 다시 파싱하지 않는다.
+    """
+    key = hashlib.blake2b(raw_text.encode(), digest_size=16).digest()
+    html = lru_get(_markdown_cache, key)
+    if html is None:
+        html = get_markdown().reset().convert(raw_text)
+        lru_put(_markdown_cache, key, html)
+    return html
 
 
 # =========================
@@ -218,6 +844,15 @@ def inject_user():
     )
 
 
+@app.context_processor
+def inject_options():
+    # 기업/학과 목록은 고정값이라 라우트마다 넘기지 않고 여기서 한 번에 주입
+    return dict(
+        company_options_html=COMPANY_OPTIONS_HTML,
+        majors=MAJORS,
+    )
+
+
 def login_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
@@ -238,43 +873,258 @@ def admin_required(f):
     return decorated_function
 
 
+# AI 프롬프트로 그대로 들어가는 폼 값의 최대 길이
+FORM_LIMITS = {"major": 50, "company": 50, "job": 50, "extra_request": 500}
+
+
+def ai_form_error(form, required):
+    """
+    required 필드가 비었거나 FORM_LIMITS 보다 긴 값이 있으면 에러 메시지, 아니면 None.
+    """
+    for name in required:
+        if not (form.get(name) or "").strip():
+            return f"{name} 값이 필요합니다."
+    for name, limit in FORM_LIMITS.items():
+        if len(form.get(name) or "") > limit:
+            return f"{name} 값이 너무 깁니다 (최대 {limit}자)."
+    return None
+
+
+def ai_form_required(*required):
+    """
+    POST 폼 검사: required 필드가 비었거나 FORM_LIMITS 보다 길면
+    검색/Groq 호출 전에 400으로 끊는다.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if request.method == "POST":
+                error = ai_form_error(request.form, required)
+                if error:
+                    return error, 400
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
+
+
+# 외부 HTTP(구글 검색 API, 소셜 로그인 토큰/사용자 정보)가 함께 쓰는 세션 (keep-alive 로 TLS 연결 재사용)
+# 응답이 없는 외부 서버 때문에 워커 스레드가 무한정 묶이지 않도록 모든 호출에 timeout 을 준다
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "5"))
+_http = requests.Session()
+_http.mount("https://", HTTPAdapter(
+    pool_connections=20,
+    pool_maxsize=20,
+    max_retries=Retry(total=2, backoff_factor=0.2),
+))
+
+
 # ▼▼▼ 구글 검색 헬퍼 함수 ▼▼▼
+SEARCH_RETRIES = 3
+SEARCH_CONCURRENCY = int(os.getenv("SEARCH_CONCURRENCY", "4"))
+_search_semaphore = threading.BoundedSemaphore(SEARCH_CONCURRENCY)
+# 검색은 get_google_search_context 가 SEARCH_RETRIES 번 재시도하므로, _http 의 urllib3 재시도가
+# 그 안에 겹치지 않도록 재시도 없는 세션을 따로 쓴다 (죽은 엔드포인트에 워커/세마포어가 오래 묶이지 않게)
+_search_http = requests.Session()
+_search_http.mount("https://", HTTPAdapter(
+    pool_connections=1,
+    pool_maxsize=SEARCH_CONCURRENCY,
+    max_retries=0,
+))
+# 둘 다 있으면 HTML 스크래핑 대신 Custom Search JSON API 를 쓴다 (요청 1번, 429 차단 없음)
+GOOGLE_CSE_KEY = os.getenv("GOOGLE_CSE_KEY")
+GOOGLE_CSE_ID = os.getenv("GOOGLE_CSE_ID")
+
+
+def search_google(query, num_results):
+    """
+    (제목, 요약, URL) 목록.
+    """
+    if GOOGLE_CSE_KEY and GOOGLE_CSE_ID:
+        res = _search_http.get(
+            "https://www.googleapis.com/customsearch/v1",
+            params={"key": GOOGLE_CSE_KEY, "cx": GOOGLE_CSE_ID, "q": query, "num": num_results},
+            timeout=HTTP_TIMEOUT,
+        )
+        res.raise_for_status()
+        return [
+            (item.get("title"), item.get("snippet"), item.get("link"))
+            for item in res.json().get("items", [])
+        ]
+    return [
+        (res.title, res.description, res.url)
+        for res in search(query, num_results=num_results, advanced=True)
+    ]
+
+
 def get_google_search_context(query, num_results=3):
+    # 같은 기업/직무 검색은 몇 시간 안에 결과가 거의 안 바뀌므로 캐시 (실패 결과는 캐시하지 않음)
+    # 대소문자/공백만 다른 입력("삼성전자  SW" / "삼성전자 sw")은 같은 검색으로 본다
+    query = " ".join(query.lower().split())
+    key = (query, num_results)
+    cached = lru_get(_search_cache, key)
+    if cached is not None:
+        return cached
     print(f"🔍 Google Search Query: {query}")
-    context_text = ""
-    try:
-        results = search(query, num_results=num_results, advanced=True)
-        for i, res in enumerate(results, 1):
-            context_text += f"""
-            [검색 결과 {i}]
-            - 제목: {res.title}
-            - 요약: {res.description}
-            - 출처: {res.url}
-            """
-    except Exception as e:
-        print(f"❌ Search Failed: {e}")
-        return "(검색 기능을 일시적으로 사용할 수 없습니다. 내부 지식으로 대체합니다.)"
+    for attempt in range(SEARCH_RETRIES):
+        try:
+            # 동시에 긁어가면 구글이 바로 차단(429)하므로 동시 검색 수를 제한
+            with _search_semaphore:
+                results = search_google(query, num_results)
+            break
+        except Exception as e:
+            print(f"❌ Search Failed ({attempt + 1}/{SEARCH_RETRIES}): {e}")
+            if attempt + 1 == SEARCH_RETRIES:
+                return "(검색 기능을 일시적으로 사용할 수 없습니다. 내부 지식으로 대체합니다.)"
+            time.sleep(0.5 * 2 ** attempt)
+    context_text = "".join(
+        f"{i}. {title} - {description} ({url})\n" for i, (title, description, url) in enumerate(results, 1)
+    )
+    lru_put(_search_cache, key, context_text, ttl=SEARCH_CACHE_TTL)
     return context_text
 
 
-def call_groq(prompt: str, system_msg: str) -> str:
-    if not client.api_key:
+# temperature > 0 이면 같은 프롬프트라도 답이 달라야 하므로 응답 캐시를 쓰지 않는다.
+# refresh=True 는 캐시된 답을 읽지 않고 새로 생성하되, 새 답으로 캐시를 덮어쓴다.
+
+
+async def acall_groq(
+    prompt: str,
+    system_msg: str,
+    tier: str = "balanced",
+    max_tokens: int = 1024,
+    ttl: int = GROQ_CACHE_TTL,
+    refresh: bool = False,
+    temperature: float = GROQ_TEMPERATURE,
+) -> str:
+    if not _HAS_GROQ:
         return "API Key Error"
     try:
-        completion = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
+        model = SPEED_MAP[tier]
+        key = groq_cache_key(prompt, system_msg, model)
+        use_cache = temperature == 0
+        raw_text = lru_get(_groq_cache, key) if use_cache and not refresh else None
+        if raw_text is None:
+            async with _groq_semaphore:
+                completion = await client.chat.completions.create(
+                    model=model,
+                    messages=[
+                        {"role": "system", "content": system_msg},
+                        {"role": "user", "content": prompt},
+                    ],
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    service_tier="auto",
+                )
+            raw_text = completion.choices[0].message.content
+            if use_cache:
+                lru_put(_groq_cache, key, raw_text, ttl=ttl)
+        # 마크다운 파싱은 CPU 작업이라 이벤트 루프를 막지 않도록 스레드로 넘긴다
+        return await asyncio.to_thread(render_markdown, raw_text)
+    except Exception as e:
+        return f"AI Error: {str(e)}"
+
+
+def call_groq(
+    prompt: str,
+    system_msg: str,
+    tier: str = "balanced",
+    max_tokens: int = 1024,
+    ttl: int = GROQ_CACHE_TTL,
+    refresh: bool = False,
+    temperature: float = GROQ_TEMPERATURE,
+) -> str:
+    return run_async(acall_groq(prompt, system_msg, tier, max_tokens, ttl, refresh, temperature))
+
+
+async def astream_groq(
+    prompt: str,
+    system_msg: str,
+    tier: str = "balanced",
+    max_tokens: int = 1024,
+    ttl: int = GROQ_CACHE_TTL,
+    refresh: bool = False,
+    temperature: float = GROQ_TEMPERATURE,
+):
+    """
+    토큰(delta)이 도착하는 대로 내보낸다. 다 받으면 원문을 응답 캐시에 넣는다.
+    """
+    model = SPEED_MAP[tier]
+    key = groq_cache_key(prompt, system_msg, model)
+    use_cache = temperature == 0
+    raw_text = lru_get(_groq_cache, key) if use_cache and not refresh else None
+    if raw_text is not None:
+        yield raw_text
+        return
+    parts = []
+    async with _groq_semaphore:
+        stream = await client.chat.completions.create(
+            model=model,
             messages=[
                 {"role": "system", "content": system_msg},
                 {"role": "user", "content": prompt},
             ],
-            temperature=0.5,
-        )
-        return markdown.markdown(
-            completion.choices[0].message.content,
-            extensions=['extra', 'nl2br', 'tables']
+            temperature=temperature,
+            max_tokens=max_tokens,
+            service_tier="auto",
+            stream=True,
         )
-    except Exception as e:
-        return f"AI Error: {str(e)}"
+        async for chunk in stream:
+            delta = chunk.choices[0].delta.content or ""
+            if delta:
+                parts.append(delta)
+                yield delta
+    if use_cache:
+        lru_put(_groq_cache, key, "".join(parts), ttl=ttl)
+
+
+def stream_groq(
+    prompt: str,
+    system_msg: str,
+    tier: str = "balanced",
+    max_tokens: int = 1024,
+    ttl: int = GROQ_CACHE_TTL,
+    refresh: bool = False,
+    temperature: float = GROQ_TEMPERATURE,
+):
+    """
+    astream_groq를 공유 이벤트 루프에서 돌리고, 조각을 큐로 받아 동기 제너레이터로 넘긴다.
+    마크다운 변환은 브라우저(marked.js)가 한다.
+    """
+    if not _HAS_GROQ:
+        yield "API Key Error"
+        return
+    chunks = queue.Queue()
+
+    async def pump():
+        try:
+            async for delta in astream_groq(prompt, system_msg, tier, max_tokens, ttl, refresh, temperature):
+                chunks.put(delta)
+        except Exception as e:
+            chunks.put(f"AI Error: {str(e)}")
+        finally:
+            chunks.put(None)
+
+    asyncio.run_coroutine_threadsafe(pump(), _loop)
+    while True:
+        delta = chunks.get()
+        if delta is None:
+            return
+        yield delta
+
+
+def sse_response(deltas):
+    """
+    텍스트 조각들을 text/event-stream 으로 흘려보낸다 (조각마다 JSON 문자열 한 개).
+    """
+    def generate():
+        for delta in deltas:
+            yield f"data: {json.dumps(delta, ensure_ascii=False)}\n\n"
+
+    return Response(
+        generate(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 # =========================
@@ -305,21 +1155,17 @@ def admin_user_timeline():
         flash("user_id가 필요합니다.", "warning")
         return redirect(url_for("admin_user_list"))
 
-    conn = get_db_connection()
-    if not conn:
-        return "DB 연결 오류", 500
-    cur = conn.cursor()
-    cur.execute("SELECT id, email, created_at FROM users WHERE id = %s", (target_user_id,))
-    user_info = cur.fetchone()
+    with db_conn() as conn:
+        if not conn:
+            return "DB 연결 오류", 500
+        cur = conn.cursor()
+        execute_prepared(cur, "user_by_id", (target_user_id,))
+        user_info = cur.fetchone()
 
-    cur.execute(
-        "SELECT * FROM experience WHERE user_id = %s ORDER BY start_date DESC NULLS LAST, id DESC",
-        (target_user_id,)
-    )
-    experiences = cur.fetchall()
+        execute_prepared(cur, "exp_by_user", (target_user_id,))
+        experiences = cur.fetchall()
 
-    cur.close()
-    conn.close()
+        cur.close()
 
     return render_template(
         "admin_user_timeline.html",
@@ -336,25 +1182,21 @@ def admin_user_backup():
         flash("user_id가 필요합니다.", "warning")
         return redirect(url_for("admin_user_list"))
 
-    conn = get_db_connection()
-    if not conn:
-        return "DB 연결 오류", 500
-    cur = conn.cursor()
+    with db_conn() as conn:
+        if not conn:
+            return "DB 연결 오류", 500
+        cur = conn.cursor()
 
-    cur.execute(
-        "SELECT id, email, created_at FROM users WHERE id = %s",
-        (target_user_id,)
-    )
-    user_info = cur.fetchone()
+        execute_prepared(cur, "user_by_id", (target_user_id,))
+        user_info = cur.fetchone()
 
-    cur.execute(
-        "SELECT COUNT(*) AS cnt FROM experience WHERE user_id = %s",
-        (target_user_id,)
-    )
-    exp_count = cur.fetchone()["cnt"]
+        cur.execute(
+            "SELECT COUNT(*) AS cnt FROM experience WHERE user_id = %s",
+            (target_user_id,)
+        )
+        exp_count = cur.fetchone()["cnt"]
 
-    cur.close()
-    conn.close()
+        cur.close()
 
     return render_template(
         "admin_user_backup.html",
@@ -364,32 +1206,7 @@ def admin_user_backup():
 # =========================
 # 4-1. 소셜 로그인 (Google + Kakao)
 # =========================
-
-from authlib.integrations.flask_client import OAuth
-import requests
-
-oauth = OAuth(app)
-
-# ----------------------------
-# 구글 OAuth 설정
-# ----------------------------
-google = oauth.register(
-    name='google',
-    client_id=os.getenv("GOOGLE_CLIENT_ID"),
-    client_secret=os.getenv("GOOGLE_CLIENT_SECRET"),
-    access_token_url='https://oauth2.googleapis.com/token',
-    authorize_url='https://accounts.google.com/o/oauth2/v2/auth',
-    api_base_url='https://www.googleapis.com/oauth2/v2/',
-    client_kwargs={'scope': 'openid email profile'}
-)
-
-
-
-# ----------------------------
-# 카카오 OAuth
-# ----------------------------
-
-KAKAO_CLIENT_ID = os.getenv("KAKAO_REST_KEY")
+# 구글/카카오/네이버 로그인은 아래 각 라우트에서 requests 로 직접 OAuth 를 처리한다
 
 # --- 일반 유저 회원가입 ---
 @app.route('/register', methods=['GET', 'POST'])
@@ -398,34 +1215,32 @@ def register():
         email = request.form.get("email")
         password = request.form.get("password")
 
-        conn = get_db_connection()
-        if not conn:
-            return "DB 연결 오류", 500
-        cur = conn.cursor()
+        with db_conn() as conn:
+            if not conn:
+                return "DB 연결 오류", 500
+            cur = conn.cursor()
 
-        # 이메일 중복 체크
-        cur.execute("SELECT id FROM users WHERE email=%s", (email,))
-        if cur.fetchone():
-            cur.close()
-            conn.close()
-            return render_template("login.html", error="이미 가입된 이메일입니다.", mode="register")
+            # 이메일 중복 체크
+            cur.execute("SELECT id FROM users WHERE email=%s", (email,))
+            if cur.fetchone():
+                cur.close()
+                return render_template("login.html", error="이미 가입된 이메일입니다.", mode="register")
 
-        pw_hash = generate_password_hash(password)
-        cur.execute(
-            """
-            INSERT INTO users (email, password_hash, created_at)
-            VALUES (%s, %s, %s)
-            RETURNING id;
-            """,
-            (email, pw_hash, datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
-        )
-        user_id = cur.fetchone()['id']
+            pw_hash = generate_password_hash(password)
+            cur.execute(
+                """
+                INSERT INTO users (email, password_hash)
+                VALUES (%s, %s)
+                RETURNING id;
+                """,
+                (email, pw_hash)
+            )
+            user_id = cur.fetchone()['id']
 
-        # 기본 프로필 생성
-        cur.execute("INSERT INTO profile (user_id) VALUES (%s)", (user_id,))
-        conn.commit()
-        cur.close()
-        conn.close()
+            # 기본 프로필 생성
+            cur.execute("INSERT INTO profile (user_id) VALUES (%s)", (user_id,))
+            conn.commit()
+            cur.close()
 
         session['logged_in'] = True
         session['is_admin'] = False
@@ -444,14 +1259,13 @@ def login():
         email = request.form.get("email")
         password = request.form.get("password")
 
-        conn = get_db_connection()
-        if not conn:
-            return "DB 연결 오류", 500
-        cur = conn.cursor()
-        cur.execute("SELECT * FROM users WHERE email=%s", (email,))
-        user = cur.fetchone()
-        cur.close()
-        conn.close()
+        with db_conn() as conn:
+            if not conn:
+                return "DB 연결 오류", 500
+            cur = conn.cursor()
+            cur.execute("SELECT * FROM users WHERE email=%s", (email,))
+            user = cur.fetchone()
+            cur.close()
 
         if not user or not check_password_hash(user['password_hash'], password):
             return render_template('login.html', error='이메일 또는 비밀번호가 틀렸습니다.', mode='login')
@@ -474,18 +1288,41 @@ def logout():
 
 
 # --- 관리자: 유저 목록 ---
+ADMIN_USERS_PAGE_SIZE = 50
+
+
 @app.route('/admin/users')
 @admin_required
 def admin_user_list():
-    conn = get_db_connection()
-    if not conn:
-        return "DB 연결 오류", 500
-    cur = conn.cursor()
-    cur.execute("SELECT id, email, created_at FROM users ORDER BY id")
-    users = cur.fetchall()
-    cur.close()
-    conn.close()
-    return render_template("admin_users.html", users=users)
+    """
+    id 기준 keyset 페이지: ?cursor=<이전 페이지 마지막 id> 다음부터 limit 명.
+    OFFSET 과 달리 뒤 페이지로 가도 앞 행들을 읽고 버리지 않는다.
+    """
+    cursor = request.args.get("cursor", 0, type=int)
+    limit = min(max(request.args.get("limit", ADMIN_USERS_PAGE_SIZE, type=int), 1), 200)
+    with db_conn() as conn:
+        if not conn:
+            return "DB 연결 오류", 500
+        cur = conn.cursor()
+        # 다음 페이지가 있는지 보려고 한 명 더 읽는다. 활동 수는 (user_id, ...) 인덱스로 유저별로 센다
+        cur.execute("""
+            SELECT u.id, u.email, u.created_at,
+                   (SELECT COUNT(*) FROM experience e WHERE e.user_id = u.id) AS exp_count
+            FROM users u
+            WHERE u.id > %s
+            ORDER BY u.id
+            LIMIT %s
+        """, (cursor, limit + 1))
+        users = cur.fetchall()
+        cur.close()
+    next_cursor = users[limit - 1]["id"] if len(users) > limit else None
+    return render_template(
+        "admin_users.html",
+        users=users[:limit],
+        cursor=cursor,
+        next_cursor=next_cursor,
+        limit=limit,
+    )
 
 
 # =========================
@@ -503,30 +1340,23 @@ def index():
     else:
         target_user_id = session.get('user_id')
 
-    exps = fetch_all_experiences(user_id=target_user_id, order_by_recent=True)
-    total_hours = sum([e['hours'] for e in exps if e['hours']])
-
-    categories = {}
-    for e in exps:
-        categories[e['category']] = categories.get(e['category'], 0) + 1
-    cat_list = [{"category": k, "cnt": v} for k, v in categories.items()]
-
-    processed_exps = []
-    today = datetime.now().strftime("%Y-%m-%d")
-    for e in exps:
-        e_dict = dict(e)
-        if e_dict['end_date'] and e_dict['end_date'] < today:
-            e_dict.update({'status': 'completed', 'status_color': 'success'})
-        else:
-            e_dict.update({'status': 'ongoing', 'status_color': 'warning'})
-        processed_exps.append(e_dict)
-
+    # 검색은 현재 페이지가 아니라 전체 활동에서 한다 (?q=)
+    q = (request.args.get('q') or "").strip()[:100]
+    page = min(max(request.args.get('page', 1, type=int), 1), INDEX_MAX_PAGE)
+    summary = get_index_summary(target_user_id, page, q)
+    total_pages = max(-(-summary["match_count"] // INDEX_PAGE_SIZE), 1)
+    if page > total_pages:
+        page = total_pages
+        summary = get_index_summary(target_user_id, page, q)
     return render_template(
         "index.html",
-        experiences=processed_exps,
-        total_count=len(exps),
-        total_hours=total_hours,
-        categories=cat_list,
+        experiences=summary["rows"],
+        total_count=summary["total_count"],
+        total_hours=summary["total_hours"],
+        categories=summary["categories"],
+        page=page,
+        total_pages=total_pages,
+        q=q,
         target_user_id=target_user_id
     )
 
@@ -547,32 +1377,32 @@ def add():
         target_user_id = session.get('user_id')
 
     if request.method == "POST":
-        conn = get_db_connection()
-        if not conn:
-            return "DB 연결 오류", 500
-        cur = conn.cursor()
-        cur.execute(
-            """
-            INSERT INTO experience
-                (user_id, category, title, description, start_date, end_date, skills, hours, link, created_at)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """,
-            (
-                target_user_id,
-                request.form.get("category"),
-                request.form.get("title"),
-                request.form.get("description"),
-                request.form.get("start_date") or None,
-                request.form.get("end_date") or None,
-                request.form.get("skills"),
-                request.form.get("hours", 3),
-                request.form.get("link"),
-                datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            ),
-        )
-        conn.commit()
-        cur.close()
-        conn.close()
+        with db_conn() as conn:
+            if not conn:
+                return "DB 연결 오류", 500
+            cur = conn.cursor()
+            cur.execute(
+                """
+                INSERT INTO experience
+                    (user_id, category, title, description, start_date, end_date, skills, hours, link)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+                """,
+                (
+                    target_user_id,
+                    request.form.get("category"),
+                    request.form.get("title"),
+                    request.form.get("description"),
+                    request.form.get("start_date") or None,
+                    request.form.get("end_date") or None,
+                    request.form.get("skills"),
+                    request.form.get("hours", 3),
+                    request.form.get("link"),
+                ),
+            )
+            notify_change(cur, "experience_changed")
+            conn.commit()
+            bump_data_version()
+            cur.close()
         return redirect(url_for("index", user_id=target_user_id if session.get('is_admin') else None))
     return render_template("add.html", target_user_id=target_user_id)
 
@@ -580,22 +1410,18 @@ def add():
 @app.route("/experience/<int:exp_id>")
 @login_required
 def experience_detail(exp_id):
-    conn = get_db_connection()
-    if not conn:
-        return "DB 연결 오류", 500
-    cur = conn.cursor()
+    with db_conn() as conn:
+        if not conn:
+            return "DB 연결 오류", 500
+        cur = conn.cursor()
 
-    if session.get('is_admin'):
-        cur.execute("SELECT * FROM experience WHERE id = %s", (exp_id,))
-    else:
-        cur.execute(
-            "SELECT * FROM experience WHERE id = %s AND user_id = %s",
-            (exp_id, session.get('user_id')),
-        )
+        if session.get('is_admin'):
+            execute_prepared(cur, "exp_by_id", (exp_id,))
+        else:
+            execute_prepared(cur, "exp_by_id_user", (exp_id, session.get('user_id')))
 
-    exp = cur.fetchone()
-    cur.close()
-    conn.close()
+        exp = cur.fetchone()
+        cur.close()
     if not exp:
         abort(404)
     return render_template("experience_detail.html", exp=exp)
@@ -604,72 +1430,74 @@ def experience_detail(exp_id):
 @app.route("/edit/<int:exp_id>", methods=["GET", "POST"])
 @login_required
 def edit(exp_id):
-    conn = get_db_connection()
-    if not conn:
-        return "DB 연결 오류", 500
-    cur = conn.cursor()
-
-    if session.get('is_admin'):
-        cur.execute("SELECT * FROM experience WHERE id = %s", (exp_id,))
-    else:
-        cur.execute(
-            "SELECT * FROM experience WHERE id = %s AND user_id = %s",
-            (exp_id, session.get('user_id')),
-        )
-    exp = cur.fetchone()
-    if not exp:
-        cur.close()
-        conn.close()
-        abort(404)
+    with db_conn() as conn:
+        if not conn:
+            return "DB 연결 오류", 500
+        cur = conn.cursor()
 
-    if request.method == "POST":
-        cur.execute(
+        if request.method == "POST":
+            # 권한 확인 + 수정을 UPDATE ... RETURNING 한 번으로 처리 (남의 행/없는 행이면 0행)
+            sql = """
+                UPDATE experience
+                SET category=%s, title=%s, description=%s, start_date=%s, end_date=%s, hours=%s, skills=%s, link=%s
+                WHERE id=%s
             """
-            UPDATE experience
-            SET category=%s, title=%s, description=%s, start_date=%s, end_date=%s, hours=%s, skills=%s, link=%s
-            WHERE id=%s
-            """,
-            (
+            params = [
                 request.form.get("category"),
                 request.form.get("title"),
                 request.form.get("description"),
-                request.form.get("start_date"),
+                request.form.get("start_date") or None,
                 request.form.get("end_date") or None,
                 request.form.get("hours"),
                 request.form.get("skills"),
                 request.form.get("link"),
                 exp_id,
-            ),
-        )
-        conn.commit()
+            ]
+            if not session.get('is_admin'):
+                sql += " AND user_id=%s"
+                params.append(session.get('user_id'))
+            cur.execute(sql + " RETURNING id", tuple(params))
+            updated = cur.fetchone()
+            notify_change(cur, "experience_changed")
+            conn.commit()
+            cur.close()
+            if not updated:
+                abort(404)
+            bump_data_version()
+            # 새로고침해도 UPDATE 가 다시 전송되지 않도록 상세 페이지로 리다이렉트
+            return redirect(url_for('experience_detail', exp_id=exp_id))
+
+        if session.get('is_admin'):
+            execute_prepared(cur, "exp_by_id", (exp_id,))
+        else:
+            execute_prepared(cur, "exp_by_id_user", (exp_id, session.get('user_id')))
+        exp = cur.fetchone()
         cur.close()
-        conn.close()
-        return redirect(url_for('experience_detail', exp_id=exp_id))
-
-    cur.close()
-    conn.close()
+    if not exp:
+        abort(404)
     return render_template("add.html", exp=exp, is_edit=True)
 
 
 @app.route("/delete/<int:exp_id>")
 @login_required
 def delete(exp_id):
-    conn = get_db_connection()
-    if not conn:
-        return "DB 연결 오류", 500
-    cur = conn.cursor()
+    with db_conn() as conn:
+        if not conn:
+            return "DB 연결 오류", 500
+        cur = conn.cursor()
 
-    if session.get('is_admin'):
-        cur.execute("DELETE FROM experience WHERE id=%s", (exp_id,))
-    else:
-        cur.execute(
-            "DELETE FROM experience WHERE id=%s AND user_id=%s",
-            (exp_id, session.get('user_id')),
-        )
+        if session.get('is_admin'):
+            cur.execute("DELETE FROM experience WHERE id=%s", (exp_id,))
+        else:
+            cur.execute(
+                "DELETE FROM experience WHERE id=%s AND user_id=%s",
+                (exp_id, session.get('user_id')),
+            )
 
-    conn.commit()
-    cur.close()
-    conn.close()
+        notify_change(cur, "experience_changed")
+        conn.commit()
+        bump_data_version()
+        cur.close()
     return redirect(url_for('index'))
 
 
@@ -688,89 +1516,117 @@ def analyze():
     else:
         target_user_id = session.get('user_id')
 
-    exps = fetch_all_experiences(order_by_recent=False, user_id=target_user_id)
-    profile = get_profile(target_user_id)
-
-    if not exps:
+    if get_portfolio_text(target_user_id) == EMPTY_PORTFOLIO_TEXT:
         return render_template(
             "analyze.html",
-            experiences=[],
             ai_result="<p>활동을 먼저 등록해주세요.</p>",
             target_user_id=target_user_id,
         )
 
-    portfolio_text = build_portfolio_text(exps)
-    prompt = f"""
-    [사용자 정보] 이름: {profile.get('name')}, 전공: {profile.get('major')}, 목표: {profile.get('career_goal')}
-    [활동 목록] {portfolio_text}
-
-    위 정보를 바탕으로 포트폴리오의 일관성, 강점 3가지, 보완해야 할 점을 분석해주세요.
-    """
-    ai_result = call_groq(prompt, "너는 날카로운 커리어 코치다.")
+    # 분석 결과는 페이지를 먼저 보여준 뒤 /analyze/stream 에서 스트리밍으로 받는다
     return render_template(
         "analyze.html",
-        experiences=exps,
-        ai_result=ai_result,
+        stream_url=url_for(
+            "analyze_stream",
+            user_id=target_user_id if session.get('is_admin') else None,
+            refresh=1 if request.args.get("refresh") else None,
+        ),
         target_user_id=target_user_id,
     )
 
 
+def analyze_prompt(user_id):
+    """
+    포트폴리오 진단용 (prompt, system_msg).
+    """
+    prompt = build_prompt_prefix(user_id) + """
+역할=날카로운 커리어 코치
+위 정보를 바탕으로 포트폴리오의 일관성, 강점 3가지, 보완해야 할 점을 분석해주세요.
+"""
+    return prompt, SYSTEM_MSG
+
+
+@app.route("/analyze/stream")
+@login_required
+def analyze_stream():
+    if session.get('is_admin'):
+        target_user_id = request.args.get('user_id', type=int)
+    else:
+        target_user_id = session.get('user_id')
+
+    if not _HAS_GROQ:
+        return sse_response(["API Key Error"])
+    prompt, system_msg = analyze_prompt(target_user_id)
+    options = GROQ_OPTIONS["analyze"]
+
+    # ?refresh=1 은 캐시된 진단을 건너뛰고 새로 생성한다 (새 진단이 캐시에 남아 다음 방문에도 보인다)
+    if request.args.get("refresh"):
+        return sse_response(stream_groq(prompt, system_msg, refresh=True, **options))
+
+    # 같은 프로필/활동으로 다시 진단하면 브라우저 캐시를 재검증만 하게 한다.
+    # ETag 는 캐시에 정상 응답이 있을 때만 붙인다 (에러 응답이 브라우저에 남지 않도록).
+    etag = groq_cache_key(prompt, system_msg, SPEED_MAP[options.get("tier", "balanced")])
+    cached = lru_get(_groq_cache, etag)
+    if cached is None:
+        return sse_response(stream_groq(prompt, system_msg, **options))
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = sse_response([cached])
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+
 @app.route('/career', methods=['GET', 'POST'])
 @login_required
+@ai_form_required("major", "company")
 def career():
     result = None
     selected_major = request.form.get('major')
     selected_company = request.form.get('company')
 
-    if request.method == 'POST' and selected_major and selected_company:
+    # 키가 없으면 검색/프롬프트 준비 없이 바로 끝낸다
+    if request.method == 'POST' and not _HAS_GROQ:
+        result = "API Key Error"
+    elif request.method == 'POST' and selected_major and selected_company:
         search_context = get_google_search_context(f"{selected_company} 채용 직무 인재상 사업분야")
-        prompt = f"""
-        [Web Data] {search_context}
-        [User] 전공: {selected_major}
-
-        위 정보를 바탕으로 이 전공자가 '{selected_company}'에서 도전 가능한 직무 5가지를 마크다운 표로 추천해줘.
-        """
-        result = call_groq(prompt, f"너는 {selected_company} 채용 전문가다.")
+        prompt = f"""전공={selected_major};회사={selected_company}
+[Web Data]
+{search_context}
+역할=채용 전문가
+이 전공자가 이 회사에서 도전 가능한 직무 5가지를 마크다운 표로 추천해줘.
+"""
+        result = call_groq(prompt, SYSTEM_MSG, **GROQ_OPTIONS["career"])
 
     return render_template(
         'career.html',
-        majors=MAJORS,
         result=result,
         sel_major=selected_major,
         sel_company=selected_company,
-        company_options=COMPANY_OPTIONS,
     )
 
 
 @app.route("/company_analyze", methods=["GET", "POST"])
 @login_required
+@ai_form_required("company")
 def company_analyze():
     if session.get('is_admin'):
         target_user_id = request.args.get('user_id', type=int)
     else:
         target_user_id = session.get('user_id')
 
-    exps = fetch_all_experiences(user_id=target_user_id)
     ai_result = None
     target_company = request.form.get("company")
     target_role = request.form.get("job")
-    profile = get_profile(target_user_id)
 
     if request.method == "POST" and target_company:
-        portfolio_text = build_portfolio_text(exps)
-        search_context = get_google_search_context(f"{target_company} {target_role} 직무 기술서 핵심 역량")
-
-        prompt = f"""
-        [Web Data] {search_context}
-        [Profile] 전공: {profile.get('major')}, 활동: {portfolio_text}
-
-        지원자의 경험이 해당 직무 JD와 얼마나 일치하는지, 부족한 점은 무엇인지, 합격 확률(%)은 얼마인지 분석해줘.
-        """
-        ai_result = call_groq(prompt, "너는 냉철한 인사 담당자다.")
+        ai_result = call_groq(
+            *company_analyze_prompt(target_user_id, request.form), **GROQ_OPTIONS["company_analyze"]
+        ) if _HAS_GROQ else "API Key Error"
 
     return render_template(
         "company_analyze.html",
-        company_options=COMPANY_OPTIONS,
         ai_result=ai_result,
         target_company=target_company,
         target_role=target_role,
@@ -778,78 +1634,289 @@ def company_analyze():
     )
 
 
+def company_analyze_prompt(user_id, form):
+    """
+    기업별 합격 확률 분석용 (prompt, system_msg).
+    """
+    target_company = form.get("company")
+    target_role = form.get("job")
+    prefix, search_context = run_parallel(
+        (build_prompt_prefix, user_id),
+        (get_google_search_context, f"{target_company} {target_role} 직무 기술서 핵심 역량"),
+    )
+    prompt = prefix + f"""회사={target_company};직무={target_role}
+[Web Data]
+{search_context}
+역할=냉철한 인사 담당자
+경험이 직무 JD와 얼마나 일치하는지, 부족한 점, 합격 확률(%)을 분석해줘.
+"""
+    return prompt, SYSTEM_MSG
+
+
+def resume_prompt(user_id, form):
+    """
+    이력서 생성용 (prompt, system_msg).
+    """
+    profile = get_profile(user_id)
+    prompt = build_prompt_prefix(user_id) + f"""회사={form.get("company")};직무={form.get("job")}
+요청={profile.get('ai_instructions') or ''}
+역할=이력서 에디터
+성과를 수치화하고 전문 용어를 써서 이력서 초안을 작성해줘.
+"""
+    return prompt, SYSTEM_MSG
+
+
+def cover_letter_prompt(user_id, form):
+    """
+    자기소개서 생성용 (prompt, system_msg).
+    """
+    target_company = form.get("company")
+    target_role = form.get("job")
+    prefix, search_context = run_parallel(
+        (build_prompt_prefix, user_id),
+        (get_google_search_context, f"{target_company} CEO 신년사 최근 이슈 인재상"),
+    )
+    prompt = prefix + f"""회사={target_company};직무={target_role}
+요청={form.get("extra_request", "")}
+[Web Data]
+{search_context}
+역할=취업 컨설턴트
+기업의 최신 이슈와 내 경험을 연결해 이 직무 자기소개서를 작성해줘.
+"""
+    return prompt, SYSTEM_MSG
+
+
 @app.route("/resume", methods=["GET", "POST"])
 @login_required
+@ai_form_required("company", "job")
 def resume():
     if session.get('is_admin'):
         target_user_id = request.args.get('user_id', type=int)
     else:
         target_user_id = session.get('user_id')
 
-    exps = fetch_all_experiences(order_by_recent=False, user_id=target_user_id)
     resume_text = None
     target_company = request.form.get("company")
     target_role = request.form.get("job")
-    profile = get_profile(target_user_id)
 
+    # JS가 꺼진 경우를 위한 일반 POST 경로 (보통은 /resume/stream 으로 스트리밍)
+    if request.method == "POST":
+        resume_text = call_groq(
+            *resume_prompt(target_user_id, request.form), **GROQ_OPTIONS["resume"]
+        ) if _HAS_GROQ else "API Key Error"
+
+    return render_template(
+        "resume.html",
+        resume_text=resume_text,
+        target_company=target_company,
+        target_role=target_role,
+        target_user_id=target_user_id,
+    )
+
+
+@app.route("/cover_letter", methods=["GET", "POST"])
+@login_required
+@ai_form_required("company", "job")
+def cover_letter():
+    if session.get('is_admin'):
+        target_user_id = request.args.get('user_id', type=int)
+    else:
+        target_user_id = session.get('user_id')
+
+    letter_text = None
+    target_company = request.form.get("company")
+    target_role = request.form.get("job")
+
+    # JS가 꺼진 경우를 위한 일반 POST 경로 (보통은 /cover_letter/stream 으로 스트리밍)
     if request.method == "POST":
-        portfolio_text = build_portfolio_text(exps)
-        prompt = f"""
-        [Target] 회사: {target_company}, 직무: {target_role}
-        [User] {profile}
-        [Experience] {portfolio_text}
+        letter_text = call_groq(
+            *cover_letter_prompt(target_user_id, request.form), **GROQ_OPTIONS["cover_letter"]
+        ) if _HAS_GROQ else "API Key Error"
+
+    return render_template(
+        "cover_letter.html",
+        letter_text=letter_text,
+        target_company=target_company,
+        target_role=target_role,
+        target_user_id=target_user_id,
+    )
+
+
+@app.route("/company_analyze/stream", methods=["POST"])
+@login_required
+@ai_form_required("company")
+def company_analyze_stream():
+    if session.get('is_admin'):
+        target_user_id = request.args.get('user_id', type=int)
+    else:
+        target_user_id = session.get('user_id')
+    if not _HAS_GROQ:
+        return sse_response(["API Key Error"])
+    return sse_response(stream_groq(*company_analyze_prompt(target_user_id, request.form), **GROQ_OPTIONS["company_analyze"]))
+
+
+@app.route("/resume/stream", methods=["POST"])
+@login_required
+@ai_form_required("company", "job")
+def resume_stream():
+    if session.get('is_admin'):
+        target_user_id = request.args.get('user_id', type=int)
+    else:
+        target_user_id = session.get('user_id')
+    if not _HAS_GROQ:
+        return sse_response(["API Key Error"])
+    return sse_response(stream_groq(*resume_prompt(target_user_id, request.form), **GROQ_OPTIONS["resume"]))
+
+
+@app.route("/cover_letter/stream", methods=["POST"])
+@login_required
+@ai_form_required("company", "job")
+def cover_letter_stream():
+    if session.get('is_admin'):
+        target_user_id = request.args.get('user_id', type=int)
+    else:
+        target_user_id = session.get('user_id')
+    if not _HAS_GROQ:
+        return sse_response(["API Key Error"])
+    return sse_response(stream_groq(*cover_letter_prompt(target_user_id, request.form), **GROQ_OPTIONS["cover_letter"]))
+
+
+# =========================
+# 6-1. 백그라운드 생성 (job_id 를 바로 돌려주고 결과는 폴링)
+# =========================
+# 작업은 요청을 받은 프로세스의 이벤트 루프에서 돌지만, 상태/결과는 ai_job 테이블에 둔다.
+# gunicorn 워커가 여럿이라 폴링 요청이 다른 워커로 갈 수 있기 때문 (result 가 NULL 이면 진행 중)
+JOB_TTL = 600
+# 유저 한 명이 동시에 돌릴 수 있는 AI 작업 수 (한 명이 Groq/검색/스레드 풀을 독차지하지 않도록)
+JOB_MAX_RUNNING = int(os.getenv("JOB_MAX_RUNNING", "6"))
+
+# 작업 이름 -> (user_id, form) -> (prompt, system_msg)
+AI_TASKS = {
+    "analyze": lambda user_id, form: analyze_prompt(user_id),
+    "resume": resume_prompt,
+    "cover_letter": cover_letter_prompt,
+}
+
+
+async def agenerate(build_prompt, options):
+    """
+    프롬프트 준비(DB/검색, 블로킹)는 스레드에서, Groq 호출은 이벤트 루프에서.
+    """
+    if not _HAS_GROQ:
+        return "API Key Error"
+    try:
+        prompt, system_msg = await asyncio.to_thread(build_prompt)
+    except Exception as e:
+        return f"AI Error: {str(e)}"
+    return await acall_groq(prompt, system_msg, **options)
+
+
+def save_job_result(job_id, name, result):
+    with db_conn() as conn:
+        if not conn:
+            print(f"Job Error: {job_id}/{name} 결과를 저장하지 못했습니다")
+            return
+        cur = conn.cursor()
+        cur.execute(
+            "UPDATE ai_job SET result = %s WHERE job_id = %s AND name = %s",
+            (result, job_id, name),
+        )
+        conn.commit()
+        cur.close()
+
+
+async def run_job_task(job_id, name, build_prompt, options):
+    result = await agenerate(build_prompt, options)
+    await asyncio.to_thread(save_job_result, job_id, name, result)
+
+
+def submit_job(conn, user_id, form, names):
+    """
+    names 작업들을 ai_job 에 등록하고 공유 이벤트 루프에 올린 뒤 job_id 를 돌려준다.
+    요청 스레드는 Groq 응답을 기다리지 않는다.
+    이 유저의 진행 중인 작업이 JOB_MAX_RUNNING 을 넘게 되면 아무것도 올리지 않고 None.
+    """
+    owner = session.get('user_id')
+    job_id = uuid.uuid4().hex
+    cur = conn.cursor()
+    # 같은 유저의 동시 요청들이 상한 검사를 함께 통과하지 않도록 유저별로 줄 세운다
+    cur.execute("SELECT pg_advisory_xact_lock(%s)", (owner or 0,))
+    # 오래된 job 정리 (결과를 안 가져간 것, 워커가 재시작돼 끝나지 못한 것 포함)
+    cur.execute("DELETE FROM ai_job WHERE created_at < NOW() - make_interval(secs => %s)", (JOB_TTL,))
+    cur.execute(
+        "SELECT COUNT(*) AS cnt FROM ai_job WHERE user_id IS NOT DISTINCT FROM %s AND result IS NULL",
+        (owner,),
+    )
+    if cur.fetchone()["cnt"] + len(names) > JOB_MAX_RUNNING:
+        conn.rollback()
+        cur.close()
+        return None
+    execute_values(
+        cur,
+        "INSERT INTO ai_job (job_id, name, user_id) VALUES %s",
+        [(job_id, name, owner) for name in names],
+    )
+    conn.commit()
+    cur.close()
+    for name in names:
+        asyncio.run_coroutine_threadsafe(
+            run_job_task(
+                job_id,
+                name,
+                lambda build=AI_TASKS[name]: build(user_id, form),
+                GROQ_OPTIONS[name],
+            ),
+            _loop,
+        )
+    return job_id
 
-        위 내용을 바탕으로 성과를 수치화하고 전문 용어를 사용하여 이력서 초안을 작성해줘.
-        """
-        resume_text = call_groq(prompt, "너는 전문 이력서 에디터다.")
 
-    return render_template(
-        "resume.html",
-        experiences=exps,
-        resume_text=resume_text,
-        company_options=COMPANY_OPTIONS,
-        target_company=target_company,
-        target_role=target_role,
-        target_user_id=target_user_id,
-    )
+def get_job(conn, job_id):
+    """
+    본인(또는 관리자) job 의 {작업 이름: 결과 HTML (진행 중이면 None)}. 없으면 404.
+    """
+    cur = conn.cursor()
+    cur.execute("SELECT name, user_id, result FROM ai_job WHERE job_id = %s", (job_id,))
+    rows = cur.fetchall()
+    cur.close()
+    if not rows or (rows[0]["user_id"] != session.get('user_id') and not session.get('is_admin')):
+        abort(404)
+    return {row["name"]: row["result"] for row in rows}
 
 
-@app.route("/cover_letter", methods=["GET", "POST"])
+@app.route("/api/generate_all", methods=["POST"])
 @login_required
-def cover_letter():
+@ai_form_required("company", "job")
+def generate_all():
+    """
+    진단/이력서/자기소개서를 공유 이벤트 루프에 한꺼번에 올리고 job_id만 바로 돌려준다.
+    세 요청이 동시에 진행되므로 기다리는 시간은 가장 느린 하나 정도.
+    결과는 /api/generate_all/<job_id> 로 끝난 것부터 가져간다.
+    """
     if session.get('is_admin'):
         target_user_id = request.args.get('user_id', type=int)
     else:
         target_user_id = session.get('user_id')
+    with db_conn() as conn:
+        if not conn:
+            return "DB 연결 오류", 500
+        job_id = submit_job(conn, target_user_id, request.form.to_dict(), ("analyze", "resume", "cover_letter"))
+    if job_id is None:
+        return "진행 중인 AI 작업이 너무 많습니다. 잠시 후 다시 시도해주세요.", 429
+    return jsonify({"job_id": job_id}), 202
 
-    exps = fetch_all_experiences(order_by_recent=False, user_id=target_user_id)
-    letter_text = None
-    target_company = request.form.get("company")
-    target_role = request.form.get("job")
-
-    if request.method == "POST":
-        extra = request.form.get("extra_request", "")
-        portfolio_text = build_portfolio_text(exps)
-        search_context = get_google_search_context(f"{target_company} CEO 신년사 최근 이슈 인재상")
-
-        prompt = f"""
-        [Web Data] {search_context}
-        [Portfolio] {portfolio_text}
-        [Req] {extra}
-
-        기업의 최신 이슈와 내 경험을 연결하여 '{target_role}' 직무 자기소개서를 작성해줘.
-        """
-        letter_text = call_groq(prompt, f"너는 {target_company} 전문 취업 컨설턴트다.")
 
-    return render_template(
-        "cover_letter.html",
-        experiences=exps,
-        letter_text=letter_text,
-        company_options=COMPANY_OPTIONS,
-        target_company=target_company,
-        target_role=target_role,
-        target_user_id=target_user_id,
-    )
+@app.route("/api/generate_all/<job_id>")
+@login_required
+def generate_all_result(job_id):
+    with db_conn() as conn:
+        if not conn:
+            return "DB 연결 오류", 500
+        results = get_job(conn, job_id)
+    return jsonify({
+        "done": all(result is not None for result in results.values()),
+        "results": results,
+    })
 
 
 @app.route("/settings", methods=["GET", "POST"])
@@ -867,38 +1934,39 @@ def settings():
     else:
         target_user_id = session.get('user_id')
 
-    conn = get_db_connection()
-    if not conn:
-        return "DB 연결 오류", 500
-    cur = conn.cursor()
+    with db_conn() as conn:
+        if not conn:
+            return "DB 연결 오류", 500
+        cur = conn.cursor()
 
-    if request.method == "POST":
-        cur.execute(
-            """
-            UPDATE profile
-            SET name=%s, major=%s, career_goal=%s, strengths=%s, ai_instructions=%s
-            WHERE user_id=%s
-            """,
-            (
-                request.form.get("name"),
-                request.form.get("major"),
-                request.form.get("career_goal"),
-                request.form.get("strengths"),
-                request.form.get("ai_instructions"),
-                target_user_id,
-            ),
-        )
-        conn.commit()
-        flash("설정이 저장되었습니다.", "success")
+        if request.method == "POST":
+            cur.execute(
+                """
+                UPDATE profile
+                SET name=%s, major=%s, career_goal=%s, strengths=%s, ai_instructions=%s
+                WHERE user_id=%s
+                """,
+                (
+                    request.form.get("name"),
+                    request.form.get("major"),
+                    request.form.get("career_goal"),
+                    request.form.get("strengths"),
+                    request.form.get("ai_instructions"),
+                    target_user_id,
+                ),
+            )
+            notify_change(cur, "profile_changed", str(target_user_id))
+            conn.commit()
+            with _cache_lock:
+                _profile_cache.pop(target_user_id, None)
+            flash("설정이 저장되었습니다.", "success")
 
-    cur.execute("SELECT * FROM profile WHERE user_id=%s", (target_user_id,))
-    profile = cur.fetchone()
-    cur.close()
-    conn.close()
+        cur.execute("SELECT * FROM profile WHERE user_id=%s", (target_user_id,))
+        profile = cur.fetchone()
+        cur.close()
     return render_template(
         "settings.html",
         profile=profile or {},
-        majors=MAJORS,
         target_user_id=target_user_id,
     )
 
@@ -913,6 +1981,59 @@ def backup_page():
     return render_template("backup.html")
 
 
+class _QueueWriter:
+    """
+    copy_expert 가 write() 하는 바이트 조각을 큐로 넘기는 파일 흉내 객체.
+    받는 쪽이 멈추면(다운로드 중단) put 이 타임아웃 나면서 COPY 도 중단된다.
+    """
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    def write(self, data):
+        self.chunks.put(bytes(data), timeout=60)
+
+
+def stream_copy_csv(sql, params):
+    """
+    COPY ... TO STDOUT 결과를 메모리에 모으지 않고 받는 즉시 흘려보낸다.
+    CSV 변환은 Postgres가 하고, COPY 는 별도 스레드에서 돌며 큐로 조각을 넘긴다.
+    """
+    chunks = queue.Queue(maxsize=64)
+
+    def copy():
+        try:
+            with db_conn() as conn:
+                if not conn:
+                    return
+                cur = conn.cursor()
+                try:
+                    query = cur.mogrify(sql, params).decode()
+                    cur.copy_expert(
+                        f"COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER, ENCODING 'UTF8')",
+                        _QueueWriter(chunks),
+                    )
+                    conn.commit()
+                except Exception as e:
+                    conn.rollback()
+                    print("❌ CSV 내보내기 실패:", e)
+                finally:
+                    cur.close()
+        finally:
+            try:
+                chunks.put(None, timeout=60)
+            except queue.Full:
+                pass
+
+    threading.Thread(target=copy, name="csv-export", daemon=True).start()
+
+    yield codecs.BOM_UTF8
+    while True:
+        chunk = chunks.get()
+        if chunk is None:
+            return
+        yield chunk
+
+
 @app.route("/api/export")
 @login_required
 def export_data():
@@ -921,30 +2042,29 @@ def export_data():
     else:
         target_user_id = session.get('user_id')
 
-    exps = fetch_all_experiences(order_by_recent=False, user_id=target_user_id)
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow(['category', 'title', 'description', 'start_date', 'end_date', 'skills', 'hours', 'link'])
-    for r in exps:
-        writer.writerow([
-            r['category'],
-            r['title'],
-            r['description'],
-            r['start_date'],
-            r['end_date'],
-            r['skills'],
-            r['hours'],
-            r.get('link', '')
-        ])
-    output.seek(0)
+    if get_pool() is None:
+        return "DB 연결 오류", 500
+
+    sql = "SELECT category, title, description, start_date, end_date, skills, hours, link FROM experience"
+    params = []
+    if target_user_id is not None:
+        sql += " WHERE user_id = %s"
+        params.append(target_user_id)
+    sql += " ORDER BY id"
+
     filename = f"portfolio_backup_user_{target_user_id or 'all'}.csv"
     return Response(
-        output.getvalue().encode("utf-8-sig"),
+        stream_copy_csv(sql, tuple(params)),
         mimetype="text/csv",
         headers={"Content-Disposition": f"attachment;filename={filename}"}
     )
 
 
+IMPORT_BATCH = 500
+# 이 행 수마다 중간 커밋 (긴 트랜잭션/WAL 누적 방지, 실패해도 앞부분은 남는다)
+IMPORT_COMMIT_EVERY = 1000
+
+
 @app.route("/api/import", methods=["POST"])
 @login_required
 def import_data():
@@ -962,42 +2082,70 @@ def import_data():
     else:
         target_user_id = session.get('user_id')
 
-    try:
-        stream = io.TextIOWrapper(file.stream, encoding='utf-8-sig')
-        csv_input = csv.DictReader(stream)
-        conn = get_db_connection()
+    stream = io.TextIOWrapper(file.stream, encoding='utf-8-sig')
+    csv_input = csv.DictReader(stream)
+
+    with db_conn() as conn:
         if not conn:
             return "DB 연결 오류", 500
         cur = conn.cursor()
-        cnt = 0
-        for row in csv_input:
-            cur.execute(
+
+        def insert_batch(batch):
+            # 한 행씩 INSERT 하지 않고 배치를 하나의 INSERT 로 묶어서 보낸다
+            execute_values(
+                cur,
                 """
                 INSERT INTO experience
-                    (user_id, category, title, description, start_date, end_date, skills, hours, link, created_at)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                    (user_id, category, title, description, start_date, end_date, skills, hours, link)
+                VALUES %s
                 """,
-                (
+                batch,
+                page_size=IMPORT_BATCH,
+            )
+
+        def commit():
+            notify_change(cur, "experience_changed")
+            conn.commit()
+            bump_data_version()
+
+        # 파일 전체를 메모리에 올리지 않고 읽으면서 IMPORT_BATCH 행씩 끊어 보낸다
+        cnt = 0
+        committed = 0
+        batch = []
+        line_no = 1  # 1번 줄은 헤더
+        try:
+            for line_no, row in enumerate(csv_input, start=2):
+                batch.append((
                     target_user_id,
                     row.get('category'),
                     row.get('title'),
                     row.get('description'),
-                    row.get('start_date'),
+                    row.get('start_date') or None,
                     row.get('end_date') or None,
                     row.get('skills'),
                     int(row.get('hours', 0) or 0),
                     row.get('link', ''),
-                    datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                ),
-            )
-            cnt += 1
-        conn.commit()
+                ))
+                if len(batch) >= IMPORT_BATCH:
+                    insert_batch(batch)
+                    cnt += len(batch)
+                    batch = []
+                    if cnt - committed >= IMPORT_COMMIT_EVERY:
+                        commit()
+                        committed = cnt
+            if batch:
+                insert_batch(batch)
+                cnt += len(batch)
+            commit()
+        except Exception as e:
+            conn.rollback()
+            cur.close()
+            # 실패한 위치: 값 변환 오류면 그 줄, DB 오류면 그 줄에서 끝나는 배치
+            return f"복구 실패 ({line_no}번째 줄 부근, {committed}개는 이미 저장됨): {str(e)}", 500
         cur.close()
-        conn.close()
-        flash(f"{cnt}개의 데이터가 복구되었습니다.", "success")
-        return redirect(url_for('index', user_id=target_user_id if session.get('is_admin') else None))
-    except Exception as e:
-        return f"복구 실패: {str(e)}", 500
+
+    flash(f"{cnt}개의 데이터가 복구되었습니다.", "success")
+    return redirect(url_for('index', user_id=target_user_id if session.get('is_admin') else None))
 
 
 @app.route("/admin/user_profile")
@@ -1008,24 +2156,23 @@ def admin_user_profile():
         flash("user_id가 필요합니다.", "warning")
         return redirect(url_for("admin_user_list"))
 
-    conn = get_db_connection()
-    if not conn:
-        return "DB 연결 오류", 500
-    cur = conn.cursor()
-    cur.execute("SELECT id, email, created_at FROM users WHERE id = %s", (target_user_id,))
-    user_info = cur.fetchone()
+    with db_conn() as conn:
+        if not conn:
+            return "DB 연결 오류", 500
+        cur = conn.cursor()
+        execute_prepared(cur, "user_by_id", (target_user_id,))
+        user_info = cur.fetchone()
 
-    cur.execute("SELECT * FROM profile WHERE user_id = %s", (target_user_id,))
-    profile = cur.fetchone()
+        cur.execute("SELECT * FROM profile WHERE user_id = %s", (target_user_id,))
+        profile = cur.fetchone()
 
-    cur.execute(
-        "SELECT * FROM experience WHERE user_id = %s ORDER BY start_date DESC NULLS LAST",
-        (target_user_id,)
-    )
-    experiences = cur.fetchall()
+        cur.execute(
+            f"SELECT {EXPERIENCE_COLUMNS} FROM experience WHERE user_id = %s ORDER BY start_date DESC NULLS LAST",
+            (target_user_id,)
+        )
+        experiences = cur.fetchall()
 
-    cur.close()
-    conn.close()
+        cur.close()
 
     return render_template(
         "admin_user_profile.html",
@@ -1038,62 +2185,52 @@ def admin_user_profile():
 @app.route("/admin/dashboard")
 @admin_required
 def admin_dashboard():
-    conn = get_db_connection()
-    if not conn:
-        return "DB 연결 오류", 500
-    cur = conn.cursor()
-
-    cur.execute("SELECT COUNT(*) AS cnt FROM users")
-    total_users = cur.fetchone()["cnt"]
-
-    cur.execute("SELECT COUNT(*) AS cnt FROM experience")
-    total_experiences = cur.fetchone()["cnt"]
-
-    cur.execute("SELECT COUNT(DISTINCT user_id) AS cnt FROM experience")
-    active_users = cur.fetchone()["cnt"]
-
-    cur.execute("""
-        SELECT COALESCE(major, '미등록') AS major, COUNT(*) AS cnt
-        FROM profile
-        GROUP BY major
-        ORDER BY cnt DESC
-        LIMIT 5
-    """)
-    majors = cur.fetchall()
-
-    cur.execute("""
-        SELECT id, email, created_at
-        FROM users
-        ORDER BY created_at DESC NULLS LAST
-        LIMIT 5
-    """)
-    recent_users = cur.fetchall()
-
-    cur.execute("""
-        SELECT u.id, u.email, COUNT(e.*) AS exp_count
-        FROM users u
-        LEFT JOIN experience e ON u.id = e.user_id
-        GROUP BY u.id, u.email
-        ORDER BY exp_count DESC, u.id
-        LIMIT 5
-    """)
-    top_users = cur.fetchall()
-
-    cur.close()
-    conn.close()
+    with db_conn() as conn:
+        if not conn:
+            return "DB 연결 오류", 500
+        cur = conn.cursor()
 
-    return render_template(
-        "admin_dashboard.html",
-        total_users=total_users,
-        total_experiences=total_experiences,
-        active_users=active_users,
-        majors=majors,
-        recent_users=recent_users,
-        top_users=top_users
-    )
+        # 서로 독립인 통계 6개를 한 번의 왕복으로 (목록은 json_agg 로 받아 dict 리스트가 된다)
+        cur.execute("""
+            WITH majors AS (
+                SELECT COALESCE(major, '미등록') AS major, COUNT(*) AS cnt
+                FROM profile
+                GROUP BY major
+                ORDER BY cnt DESC
+                LIMIT 5
+            ),
+            recent_users AS (
+                SELECT id, email, created_at
+                FROM users
+                ORDER BY created_at DESC NULLS LAST
+                LIMIT 5
+            ),
+            top_users AS (
+                SELECT u.id, u.email, COUNT(e.*) AS exp_count
+                FROM users u
+                LEFT JOIN experience e ON u.id = e.user_id
+                GROUP BY u.id, u.email
+                ORDER BY exp_count DESC, u.id
+                LIMIT 5
+            )
+            SELECT
+                (SELECT COUNT(*) FROM users) AS total_users,
+                (SELECT COUNT(*) FROM experience) AS total_experiences,
+                (SELECT COUNT(DISTINCT user_id) FROM experience) AS active_users,
+                COALESCE((SELECT json_agg(m ORDER BY cnt DESC) FROM majors m), '[]') AS majors,
+                -- 가입일은 템플릿에 그대로 찍으므로 JSON 의 ISO 형식(T 구분) 대신 text 로
+                COALESCE((
+                    SELECT json_agg(
+                        json_build_object('id', id, 'email', email, 'created_at', created_at::text)
+                        ORDER BY created_at DESC NULLS LAST
+                    ) FROM recent_users
+                ), '[]') AS recent_users,
+                COALESCE((SELECT json_agg(t ORDER BY exp_count DESC, id) FROM top_users t), '[]') AS top_users
+        """)
+        stats = cur.fetchone()
+        cur.close()
 
-from urllib.parse import urlencode
-import requests
+    return render_template("admin_dashboard.html", **stats)
 
 def social_login_process(email: str):
     """
@@ -1102,39 +2239,37 @@ def social_login_process(email: str):
     - profile도 같이 생성
     - 세션에 로그인 상태 저장
     """
-    conn = get_db_connection()
-    if not conn:
-        return "DB 연결 오류", 500
-    cur = conn.cursor()
+    with db_conn() as conn:
+        if not conn:
+            return "DB 연결 오류", 500
+        cur = conn.cursor()
 
-    # 1) 기존 사용자 조회
-    cur.execute("SELECT * FROM users WHERE email = %s", (email,))
-    user = cur.fetchone()
+        # 1) 기존 사용자 조회
+        cur.execute("SELECT * FROM users WHERE email = %s", (email,))
+        user = cur.fetchone()
 
-    # 2) 없으면 신규 생성
-    if not user:
-        cur.execute(
-            """
-            INSERT INTO users (email, password_hash, created_at)
-            VALUES (%s, %s, %s)
-            RETURNING id;
-            """,
-            (
-                email,
-                "",  # 소셜 로그인은 비밀번호 없음
-                datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            ),
-        )
-        user_id = cur.fetchone()["id"]
+        # 2) 없으면 신규 생성
+        if not user:
+            cur.execute(
+                """
+                INSERT INTO users (email, password_hash)
+                VALUES (%s, %s)
+                RETURNING id;
+                """,
+                (
+                    email,
+                    "",  # 소셜 로그인은 비밀번호 없음
+                ),
+            )
+            user_id = cur.fetchone()["id"]
 
-        # profile 기본 레코드 생성
-        cur.execute("INSERT INTO profile (user_id) VALUES (%s)", (user_id,))
-        conn.commit()
-    else:
-        user_id = user["id"]
+            # profile 기본 레코드 생성
+            cur.execute("INSERT INTO profile (user_id) VALUES (%s)", (user_id,))
+            conn.commit()
+        else:
+            user_id = user["id"]
 
-    cur.close()
-    conn.close()
+        cur.close()
 
     # 3) 세션 로그인 처리
     session["logged_in"] = True
@@ -1151,10 +2286,6 @@ def social_login_process(email: str):
 # ================================
 # 네이버 로그인 (OAuth)
 # ================================
-import requests
-import os
-from flask import request, redirect, session, flash
-
 NAVER_CLIENT_ID = os.getenv("NAVER_CLIENT_ID")
 NAVER_CLIENT_SECRET = os.getenv("NAVER_CLIENT_SECRET")
 NAVER_REDIRECT_URI = os.getenv("NAVER_REDIRECT_URI")
@@ -1182,7 +2313,7 @@ def naver_callback():
 
     # 1) 토큰 요청
     token_url = "https://nid.naver.com/oauth2.0/token"
-    token_res = requests.post(
+    token_res = _http.post(
         token_url,
         data={
             "grant_type": "authorization_code",
@@ -1193,6 +2324,7 @@ def naver_callback():
             "redirect_uri": NAVER_REDIRECT_URI,
         },
         headers={"Content-Type": "application/x-www-form-urlencoded"},
+        timeout=HTTP_TIMEOUT,
     ).json()
 
     if "access_token" not in token_res:
@@ -1201,9 +2333,10 @@ def naver_callback():
     access_token = token_res["access_token"]
 
     # 2) 사용자 정보 요청
-    user_info = requests.get(
+    user_info = _http.get(
         "https://openapi.naver.com/v1/nid/me",
-        headers={"Authorization": f"Bearer {access_token}"}
+        headers={"Authorization": f"Bearer {access_token}"},
+        timeout=HTTP_TIMEOUT,
     ).json()
 
     if user_info.get("resultcode") != "00":
@@ -1216,55 +2349,53 @@ def naver_callback():
         email = f"naver_user_{naver_id}@noemail.com"
 
     # 3) DB 처리 (provider+provider_id → email 순으로 체크)
-    conn = get_db_connection()
-    if not conn:
-        return "DB 연결 오류", 500
-    cur = conn.cursor()
-
-    # 3-1) 이미 네이버로 연결된 계정이 있는지?
-    cur.execute(
-        "SELECT * FROM users WHERE provider = %s AND provider_id = %s",
-        ("naver", naver_id),
-    )
-    user = cur.fetchone()
+    with db_conn() as conn:
+        if not conn:
+            return "DB 연결 오류", 500
+        cur = conn.cursor()
 
-    if user:
-        user_id = user["id"]
-    else:
-        # 3-2) 같은 이메일 계정이 있는지?
-        cur.execute("SELECT * FROM users WHERE email = %s", (email,))
-        existing = cur.fetchone()
+        # 3-1) 이미 네이버로 연결된 계정이 있는지?
+        cur.execute(
+            "SELECT * FROM users WHERE provider = %s AND provider_id = %s",
+            ("naver", naver_id),
+        )
+        user = cur.fetchone()
 
-        if existing:
-            # 기존 계정에 네이버 정보만 연결
-            user_id = existing["id"]
-            cur.execute(
-                "UPDATE users SET provider = %s, provider_id = %s WHERE id = %s",
-                ("naver", naver_id, user_id),
-            )
-            conn.commit()
+        if user:
+            user_id = user["id"]
         else:
-            # 3-3) 완전 신규 → INSERT
-            cur.execute(
-                """
-                INSERT INTO users (email, password_hash, created_at, provider, provider_id)
-                VALUES (%s, %s, %s, %s, %s)
-                RETURNING id;
-                """,
-                (
-                    email,
-                    "",  # 소셜 로그인이라 비밀번호 없음
-                    datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                    "naver",
-                    naver_id,
+            # 3-2) 같은 이메일 계정이 있는지?
+            cur.execute("SELECT * FROM users WHERE email = %s", (email,))
+            existing = cur.fetchone()
+
+            if existing:
+                # 기존 계정에 네이버 정보만 연결
+                user_id = existing["id"]
+                cur.execute(
+                    "UPDATE users SET provider = %s, provider_id = %s WHERE id = %s",
+                    ("naver", naver_id, user_id),
                 )
-            )
-            user_id = cur.fetchone()["id"]
-            cur.execute("INSERT INTO profile (user_id) VALUES (%s)", (user_id,))
-            conn.commit()
+                conn.commit()
+            else:
+                # 3-3) 완전 신규 → INSERT
+                cur.execute(
+                    """
+                    INSERT INTO users (email, password_hash, provider, provider_id)
+                    VALUES (%s, %s, %s, %s)
+                    RETURNING id;
+                    """,
+                    (
+                        email,
+                        "",  # 소셜 로그인이라 비밀번호 없음
+                        "naver",
+                        naver_id,
+                    )
+                )
+                user_id = cur.fetchone()["id"]
+                cur.execute("INSERT INTO profile (user_id) VALUES (%s)", (user_id,))
+                conn.commit()
 
-    cur.close()
-    conn.close()
+        cur.close()
 
     # 4) 세션 로그인 처리
     session["logged_in"] = True
@@ -1313,7 +2444,7 @@ def google_callback():
     code = request.args.get("code")
 
     # 1) 토큰 교환
-    token_res = requests.post(
+    token_res = _http.post(
         "https://oauth2.googleapis.com/token",
         data={
             "code": code,
@@ -1323,6 +2454,7 @@ def google_callback():
             "grant_type": "authorization_code",
         },
         headers={"Content-Type": "application/x-www-form-urlencoded"},
+        timeout=HTTP_TIMEOUT,
     ).json()
 
     access_token = token_res.get("access_token")
@@ -1330,9 +2462,10 @@ def google_callback():
         return "구글 토큰 발급 오류: " + str(token_res), 500
 
     # 2) 사용자 정보 조회
-    user_info = requests.get(
+    user_info = _http.get(
         "https://www.googleapis.com/oauth2/v3/userinfo",
-        headers={"Authorization": f"Bearer {access_token}"}
+        headers={"Authorization": f"Bearer {access_token}"},
+        timeout=HTTP_TIMEOUT,
     ).json()
 
     google_id = str(user_info.get("sub"))
@@ -1341,56 +2474,54 @@ def google_callback():
         email = f"google_user_{google_id}@noemail.com"
 
     # 3) DB 처리
-    conn = get_db_connection()
-    if not conn:
-        return "DB 연결 오류", 500
-    cur = conn.cursor()
-
-    # 3-1) 이미 구글로 연결된 계정이 있는지 먼저 확인
-    cur.execute(
-        "SELECT * FROM users WHERE provider = %s AND provider_id = %s",
-        ("google", google_id),
-    )
-    user = cur.fetchone()
+    with db_conn() as conn:
+        if not conn:
+            return "DB 연결 오류", 500
+        cur = conn.cursor()
 
-    if user:
-        # 이미 구글 계정 연결된 사용자
-        user_id = user["id"]
-    else:
-        # 3-2) 같은 이메일을 가진 계정이 있는지 확인
-        cur.execute("SELECT * FROM users WHERE email = %s", (email,))
-        existing = cur.fetchone()
+        # 3-1) 이미 구글로 연결된 계정이 있는지 먼저 확인
+        cur.execute(
+            "SELECT * FROM users WHERE provider = %s AND provider_id = %s",
+            ("google", google_id),
+        )
+        user = cur.fetchone()
 
-        if existing:
-            # 기존 이메일 계정에 구글 정보만 연결
-            user_id = existing["id"]
-            cur.execute(
-                "UPDATE users SET provider = %s, provider_id = %s WHERE id = %s",
-                ("google", google_id, user_id),
-            )
-            conn.commit()
+        if user:
+            # 이미 구글 계정 연결된 사용자
+            user_id = user["id"]
         else:
-            # 3-3) 완전 신규 유저 → 새로 INSERT
-            cur.execute(
-                """
-                INSERT INTO users (email, password_hash, created_at, provider, provider_id)
-                VALUES (%s, %s, %s, %s, %s)
-                RETURNING id;
-                """,
-                (
-                    email,
-                    "",  # 소셜 로그인이라 비번 없음
-                    datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                    "google",
-                    google_id,
+            # 3-2) 같은 이메일을 가진 계정이 있는지 확인
+            cur.execute("SELECT * FROM users WHERE email = %s", (email,))
+            existing = cur.fetchone()
+
+            if existing:
+                # 기존 이메일 계정에 구글 정보만 연결
+                user_id = existing["id"]
+                cur.execute(
+                    "UPDATE users SET provider = %s, provider_id = %s WHERE id = %s",
+                    ("google", google_id, user_id),
                 )
-            )
-            user_id = cur.fetchone()["id"]
-            cur.execute("INSERT INTO profile (user_id) VALUES (%s)", (user_id,))
-            conn.commit()
+                conn.commit()
+            else:
+                # 3-3) 완전 신규 유저 → 새로 INSERT
+                cur.execute(
+                    """
+                    INSERT INTO users (email, password_hash, provider, provider_id)
+                    VALUES (%s, %s, %s, %s)
+                    RETURNING id;
+                    """,
+                    (
+                        email,
+                        "",  # 소셜 로그인이라 비번 없음
+                        "google",
+                        google_id,
+                    )
+                )
+                user_id = cur.fetchone()["id"]
+                cur.execute("INSERT INTO profile (user_id) VALUES (%s)", (user_id,))
+                conn.commit()
 
-    cur.close()
-    conn.close()
+        cur.close()
 
     # 4) 세션 로그인 처리
     session["logged_in"] = True
@@ -1435,7 +2566,7 @@ def kakao_callback():
     redirect_uri = os.getenv("KAKAO_REDIRECT_URI")
 
     # 1) Access Token 발급
-    token_res = requests.post(
+    token_res = _http.post(
         "https://kauth.kakao.com/oauth/token",
         data={
             "grant_type": "authorization_code",
@@ -1445,6 +2576,7 @@ def kakao_callback():
             "code": code,
         },
         headers={"Content-type": "application/x-www-form-urlencoded"},
+        timeout=HTTP_TIMEOUT,
     ).json()
 
     access_token = token_res.get("access_token")
@@ -1452,9 +2584,10 @@ def kakao_callback():
         return f"카카오 토큰 발급 오류: {token_res}"
 
     # 2) 사용자 정보 요청
-    user_res = requests.get(
+    user_res = _http.get(
         "https://kapi.kakao.com/v2/user/me",
-        headers={"Authorization": f"Bearer {access_token}"}
+        headers={"Authorization": f"Bearer {access_token}"},
+        timeout=HTTP_TIMEOUT,
     ).json()
 
     kakao_id = str(user_res["id"])
@@ -1464,55 +2597,53 @@ def kakao_callback():
         email = f"kakao_user_{kakao_id}@noemail.com"
 
     # 3) DB 저장 (provider+provider_id → email 순으로 체크)
-    conn = get_db_connection()
-    if not conn:
-        return "DB 연결 오류", 500
-    cur = conn.cursor()
-
-    # 3-1) 이미 카카오로 연결된 계정?
-    cur.execute(
-        "SELECT * FROM users WHERE provider = %s AND provider_id = %s",
-        ("kakao", kakao_id),
-    )
-    user = cur.fetchone()
+    with db_conn() as conn:
+        if not conn:
+            return "DB 연결 오류", 500
+        cur = conn.cursor()
 
-    if user:
-        user_id = user["id"]
-    else:
-        # 3-2) 같은 이메일 계정이 있는지 확인
-        cur.execute("SELECT * FROM users WHERE email = %s", (email,))
-        existing = cur.fetchone()
+        # 3-1) 이미 카카오로 연결된 계정?
+        cur.execute(
+            "SELECT * FROM users WHERE provider = %s AND provider_id = %s",
+            ("kakao", kakao_id),
+        )
+        user = cur.fetchone()
 
-        if existing:
-            # 기존 이메일 계정에 카카오 정보 연결
-            user_id = existing["id"]
-            cur.execute(
-                "UPDATE users SET provider = %s, provider_id = %s WHERE id = %s",
-                ("kakao", kakao_id, user_id),
-            )
-            conn.commit()
+        if user:
+            user_id = user["id"]
         else:
-            # 3-3) 신규 계정 생성
-            cur.execute(
-                """
-                INSERT INTO users (email, password_hash, created_at, provider, provider_id)
-                VALUES (%s, %s, %s, %s, %s)
-                RETURNING id;
-                """,
-                (
-                    email,
-                    "",  # 소셜 로그인 비번 없음
-                    datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                    "kakao",
-                    kakao_id,
+            # 3-2) 같은 이메일 계정이 있는지 확인
+            cur.execute("SELECT * FROM users WHERE email = %s", (email,))
+            existing = cur.fetchone()
+
+            if existing:
+                # 기존 이메일 계정에 카카오 정보 연결
+                user_id = existing["id"]
+                cur.execute(
+                    "UPDATE users SET provider = %s, provider_id = %s WHERE id = %s",
+                    ("kakao", kakao_id, user_id),
                 )
-            )
-            user_id = cur.fetchone()["id"]
-            cur.execute("INSERT INTO profile (user_id) VALUES (%s)", (user_id,))
-            conn.commit()
+                conn.commit()
+            else:
+                # 3-3) 신규 계정 생성
+                cur.execute(
+                    """
+                    INSERT INTO users (email, password_hash, provider, provider_id)
+                    VALUES (%s, %s, %s, %s)
+                    RETURNING id;
+                    """,
+                    (
+                        email,
+                        "",  # 소셜 로그인 비번 없음
+                        "kakao",
+                        kakao_id,
+                    )
+                )
+                user_id = cur.fetchone()["id"]
+                cur.execute("INSERT INTO profile (user_id) VALUES (%s)", (user_id,))
+                conn.commit()
 
-    cur.close()
-    conn.close()
+        cur.close()
 
     # 4) 세션 설정
     session["logged_in"] = True
@@ -1524,5 +2655,13 @@ def kakao_callback():
 
 
 
+# 스키마 준비는 기동 시 한 번만 (요청마다 before_request 로 확인하지 않는다)
+if os.getenv("FLASK_SKIP_DB_INIT") != "1":
+    try:
+        init_db()
+    except psycopg2.Error as e:
+        print("DB init error:", e)
+
+
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=int(os.environ.get("PORT", 5000)), debug=True)
+    app.run(host="0.0.0.0", port=int(os.environ.get("PORT", 5000)), debug=DEBUG)
@@ -0,0 +1,19 @@
+# gunicorn 설정: gunicorn -c gunicorn.conf.py app:app
+#
+# gevent 대신 gthread 워커를 쓴다.
+# app.py가 Groq 호출용 asyncio 루프를 별도 스레드에서 돌리고, LISTEN/NOTIFY 스레드도 있어서
+# gevent monkey-patch와 섞으면 루프/셀렉트가 그린렛 위에서 꼬인다.
+# LLM/DB 대기는 스레드가 I/O에서 GIL을 놓으므로 gthread로도 충분히 병렬 처리된다.
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+worker_class = "gthread"
+workers = int(os.environ.get("WEB_CONCURRENCY", 2))
+# 풀이 다 차면 db_conn 이 PG_POOL_TIMEOUT 초까지 반납을 기다리고, 그래도 없으면 "DB 연결 오류" 를 낸다.
+# 스레드 수가 PG_POOL_MAX 보다 많으면 넘는 스레드는 커넥션을 기다리게 되므로 보통은 비슷하게 맞춘다
+# (SSE 스트리밍처럼 DB 를 쓰지 않고 오래 붙잡는 요청이 많으면 스레드를 더 늘려도 된다)
+threads = int(os.environ.get("GUNICORN_THREADS", 8))
+
+# 스트리밍 응답(SSE)이 LLM 생성 시간만큼 이어지므로 넉넉하게
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 120))
+keepalive = 5